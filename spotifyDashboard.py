@@ -1,42 +1,159 @@
-from dash import Dash, dcc, html, Input, Output
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import argparse
+import contextvars
+import functools
+import importlib
 import json
+import os
+import subprocess
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlencode
+
+import flask
+from dash import Dash, ctx, dcc, html, no_update, Input, Output, State
+from dash.exceptions import PreventUpdate
+import plotly.graph_objects as go
+
+from spotifyProfiling import PROFILING_ENABLED, install_profile_route, profiled
+from spotifyDatasets import DEFAULT_DATASET, DEFAULT_MEMORY_LIMIT_MB, DatasetRegistry, discover_datasets
+from spotifyExport import EXPORT_FORMATS, arrow_available, export_etag, stream_table
+from spotifyLive import PUBLISH_FILE, ArtistFeed, LiveStats
+from spotifySummaries import SUMMARIES_FILE, build_summaries, load_summaries, summaries_current
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported on first attribute access.
+
+    importlib.util.LazyLoader is not safe here: before Python 3.12 a second thread touching the module
+    while the first is still executing it sees a half-initialized module. import_module holds the
+    module's import lock instead, so concurrent first accesses wait for the import to finish.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def lazy_import(name):
+    """
+    Return a module whose body only executes on first attribute access.
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+# pandas and plotly.express dominate the import time, so defer them until the data or a chart is needed
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+px = lazy_import("plotly.express")
+similarity = lazy_import("spotifySimilarity")
+genre_index = lazy_import("spotifyGenreIndex")
+
+# Wall-clock seconds spent in each startup step, filled in as the steps run
+STARTUP_TIMINGS = {"import modules": time.perf_counter() - _IMPORT_STARTED}
+
+# Dataset whose parts are loading; the steps timed meanwhile are recorded as "<dataset>: <step>"
+_timed_dataset = contextvars.ContextVar("timed_dataset", default=None)
 
 # Load Spotify cache data
 CACHE_FILE = "spotify_cache.json"
 
+# Valence from which a track counts as neutral and as positive; below the first it is negative
+SENTIMENT_THRESHOLDS = (0.3, 0.7)
 
-def load_spotify_data():
+# Seconds between refreshes of the live extraction panel
+LIVE_REFRESH_SECONDS = 5
+
+
+@contextmanager
+def timed(step):
+    """
+    Record how long the wrapped block takes under STARTUP_TIMINGS[step], prefixed with the dataset
+    being loaded if any.
+    """
+    dataset = _timed_dataset.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[f"{dataset}: {step}" if dataset else step] = time.perf_counter() - start
+
+
+def timed_by_dataset(load):
+    """
+    Decorate a dataset part loader so the steps it times are keyed by its dataset.
+    """
+    @functools.wraps(load)
+    def wrapper(dataset, previous):
+        token = _timed_dataset.set(dataset.name)
+        try:
+            return load(dataset, previous)
+        finally:
+            _timed_dataset.reset(token)
+    return wrapper
+
+
+def load_spotify_data(cache_file=CACHE_FILE):
     """
     Load Spotify data from cache and process it into a DataFrame.
     """
-    with open(CACHE_FILE, "r") as f:
-        spotify_data = json.load(f)
-
-    data = []
-    for artist, details in spotify_data.items():
-        for album in details.get("albums", []):
-            for track in album.get("tracks", []):
-                data.append({
-                    "Band Name": artist,
-                    "Followers": details["followers"],
-                    "Popularity": details["popularity"],
-                    "Genres": ", ".join(details["genres"]),
-                    "Album Name": album["album_name"],
-                    "Release Date": album["release_date"],
-                    "Track Name": track["track_name"],
-                    "Danceability": track["audio_features"]["danceability"],
-                    "Energy": track["audio_features"]["energy"],
-                    "Valence": track["audio_features"]["valence"],
-                    "Acousticness": track["audio_features"]["acousticness"],
-                    "Loudness": track["audio_features"]["loudness"]
-                })
-    df = pd.DataFrame(data)
+    with timed("read cache"):
+        with open(cache_file, "r") as f:
+            spotify_data = json.load(f)
+
+    with timed("flatten records"):
+        data = []
+        for artist, details in spotify_data.items():
+            for album in details.get("albums", []):
+                for track in album.get("tracks", []):
+                    data.append({
+                        "Band Name": artist,
+                        "Followers": details["followers"],
+                        "Popularity": details["popularity"],
+                        "Genres": ", ".join(details["genres"]),
+                        "Album Name": album["album_name"],
+                        "Release Date": album["release_date"],
+                        "Track Name": track["track_name"],
+                        "Track ID": track.get("track_id"),
+                        "Danceability": track["audio_features"]["danceability"],
+                        "Energy": track["audio_features"]["energy"],
+                        "Valence": track["audio_features"]["valence"],
+                        "Acousticness": track["audio_features"]["acousticness"],
+                        "Instrumentalness": track["audio_features"].get("instrumentalness"),
+                        "Liveness": track["audio_features"].get("liveness"),
+                        "Speechiness": track["audio_features"].get("speechiness"),
+                        "Loudness": track["audio_features"]["loudness"],
+                        "Tempo": track["audio_features"].get("tempo")
+                    })
+
+    with timed("build DataFrame"):
+        df = pd.DataFrame(data)
+
+    # Release years straight from the date strings, which come with year, month or day precision;
+    # unknown dates ("0000") become missing
+    with timed("derive columns"):
+        years = pd.to_numeric(df['Release Date'].str.slice(0, 4), errors='coerce')
+        df['Year'] = years.where(years > 0).astype('Int16')
+        df['Sentiment'] = pd.cut(
+            df['Valence'],
+            bins=[-float('inf'), SENTIMENT_THRESHOLDS[0], SENTIMENT_THRESHOLDS[1], float('inf')],
+            labels=["Negative", "Neutral", "Positive"],
+            right=False
+        )
 
     # Convert release date to datetime
-    df['Release Date'] = pd.to_datetime(df['Release Date'], errors='coerce')
+    with timed("parse release dates"):
+        df['Release Date'] = pd.to_datetime(df['Release Date'], errors='coerce')
     return df
 
 def map_genres(genre_list):
@@ -64,140 +181,606 @@ def map_genres(genre_list):
             return broad_category
     return "Other"
 
-# Load and preprocess data
-df = load_spotify_data()
-df['Broad Genre'] = df['Genres'].apply(map_genres)
+def load_artist_data(summaries_file=SUMMARIES_FILE, cache_file=CACHE_FILE):
+    """
+    Load the extractor's per-artist summary table into a DataFrame with one row per band. Feature
+    columns hold the mean over the band's tracks. Falls back to summarizing the cache when the
+    summaries file is missing or older than the cache.
+    """
+    summaries = None
+    if summaries_current(summaries_file, cache_file):
+        with timed("read summaries"):
+            summaries = load_summaries(summaries_file)
+    if summaries is None:
+        with timed("summarize cache"):
+            with open(cache_file, "r") as f:
+                summaries = build_summaries(json.load(f))
+
+    with timed("build artist DataFrame"):
+        rows = []
+        for artist, summary in summaries["artists"].items():
+            # Bands without tracks never appear in the track-level views either
+            if not summary["tracks"]:
+                continue
+            row = {
+                "Band Name": artist,
+                "Followers": summary["followers"],
+                "Popularity": summary["popularity"],
+                "Genres": ", ".join(summary["genres"]),
+                "Tracks": summary["tracks"],
+                "Albums": summary["albums"],
+                "First Year": summary["first_year"],
+                "Last Year": summary["last_year"]
+            }
+            for feature, stats in summary["features"].items():
+                row[feature.capitalize()] = stats["mean"]
+            rows.append(row)
+        artists_df = pd.DataFrame(rows)
+        artists_df['Broad Genre'] = artists_df['Genres'].apply(map_genres)
+
+    with timed("derive artist columns"):
+        # A band without genres has an empty string, which still counts as one genre
+        artists_df['Num Genres'] = (artists_df['Genres'].str.count(", ") + 1).astype('int8')
+        artists_df['Genre Diversity'] = pd.Categorical(
+            np.where(artists_df['Num Genres'] == 1, 'Single-Genre', 'Multi-Genre'),
+            categories=['Single-Genre', 'Multi-Genre']
+        )
+    return artists_df
+
+
+def cache_version(dataset):
+    return dataset.cache_file, os.path.getmtime(dataset.cache_file)
+
+
+def summaries_version(dataset):
+    # The summaries while they are up to date with the cache, otherwise the cache they are built from
+    current = summaries_current(dataset.summaries_file, dataset.cache_file)
+    path = dataset.summaries_file if current else dataset.cache_file
+    return path, os.path.getmtime(path)
+
+
+@timed_by_dataset
+def load_tracks(dataset, previous):
+    with timed("load data"):
+        df = load_spotify_data(dataset.cache_file)
+    with timed("map genres"):
+        df['Broad Genre'] = df['Genres'].apply(map_genres)
+    return df
+
+
+@timed_by_dataset
+def load_artists(dataset, previous):
+    with timed("load artist summaries"):
+        return load_artist_data(dataset.summaries_file, dataset.cache_file)
+
+
+@timed_by_dataset
+def load_similarity_index(dataset, previous):
+    # Updating the previous index only rebuilds the bands whose tracks changed
+    df = dataset.get("tracks")
+    with timed("build similarity index"):
+        index = previous or similarity.SimilarityIndex()
+        index.update(df)
+    return index
+
+
+@timed_by_dataset
+def load_track_genre_index(dataset, previous):
+    df = dataset.get("tracks")
+    with timed("index track genres"):
+        return genre_index.GenreIndex(df['Genres'])
+
+
+@timed_by_dataset
+def load_artist_genre_index(dataset, previous):
+    df = dataset.get("artists")
+    with timed("index artist genres"):
+        return genre_index.GenreIndex(df['Genres'])
+
+
+# What each dataset derives from its files: the track rows, the per-band summaries (which the artist-level
+# views use so they never load the tracks), the nearest-neighbour index over the tracks' audio features and
+# the raw genre index over the rows of each DataFrame.
+# Each part is loaded on first use and reloaded when the file it comes from changes.
+DATASET_PARTS = {
+    "tracks": (cache_version, load_tracks),
+    "artists": (summaries_version, load_artists),
+    "similarity": (cache_version, load_similarity_index),
+    "tracks genre index": (cache_version, load_track_genre_index),
+    "artists genre index": (summaries_version, load_artist_genre_index),
+}
+
+# Served datasets, loaded lazily and evicted least recently used first when over the memory limit
+DATASETS = DatasetRegistry({DEFAULT_DATASET: CACHE_FILE}, DATASET_PARTS)
+
+# Running aggregates of the artists an extractor publishes, and the feed they are read from, which --follow sets
+LIVE_STATS = LiveStats(map_genres, SENTIMENT_THRESHOLDS)
+LIVE_FEED = None
+
+
+def get_df(dataset=None):
+    """
+    Return the preprocessed track-level DataFrame of a dataset (the default one when not given).
+    """
+    return DATASETS.get(dataset).get("tracks")
+
+
+def get_artists_df(dataset=None):
+    """
+    Return the per-band DataFrame of a dataset, for views that only need artist-level statistics.
+    """
+    return DATASETS.get(dataset).get("artists")
+
+
+def get_similarity_index(dataset=None):
+    return DATASETS.get(dataset).get("similarity")
+
+
+def get_genre_index(dataset=None, part="tracks"):
+    """
+    Return the raw genre index over the rows of a dataset's "tracks" or "artists" DataFrame.
+    """
+    return DATASETS.get(dataset).get(f"{part} genre index")
+
+
+def raw_genre_query(raw_genres, mode='any'):
+    """
+    GenreIndex query for the raw genre filter: rows with any of the selected genres, or with all of them.
+    """
+    if not raw_genres:
+        return []
+    return [[genre] for genre in raw_genres] if mode == 'all' else [list(raw_genres)]
+
+
+def raw_genre_options(index):
+    return [{'label': f"{genre} ({count})", 'value': genre} for genre, count in index.counts.items()]
+
+
+def filter_mask(df, selected_genres=None, popularity_range=None, genre_query=None, genre_index=None):
+    """
+    Boolean array marking the rows that match the dashboard filters: one of the selected broad genres,
+    a popularity within the range, bounds included, and the raw genres of genre_query, resolved through
+    genre_index, the GenreIndex of df. Works on the track and the per-band DataFrame alike.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    if selected_genres:
+        mask &= df['Broad Genre'].isin(selected_genres).to_numpy()
+    if popularity_range:
+        mask &= df['Popularity'].between(popularity_range[0], popularity_range[1]).to_numpy()
+    if genre_query:
+        mask &= genre_index.mask(genre_query)
+    return mask
+
+
+def filter_rows(df, selected_genres=None, popularity_range=None, genre_query=None, genre_index=None):
+    """
+    The rows of df matching the dashboard filters, or df itself when no filter is set.
+    """
+    if not selected_genres and not popularity_range and not genre_query:
+        return df
+    return df[filter_mask(df, selected_genres, popularity_range, genre_query, genre_index)]
+
+
+def count_genre_tracks(artists_df):
+    """
+    Number of songs per broad genre, sorted alphabetically.
+    """
+    genre_counts = artists_df.groupby('Broad Genre')['Tracks'].sum().reset_index()
+    genre_counts.columns = ['Genre', 'Song Count']  # Rename columns for clarity
+    return genre_counts.sort_values(by='Genre')
+
+
+def count_genre_diversity(artists_df):
+    """
+    Number of single-genre and multi-genre bands.
+    """
+    genre_diversity_counts = (
+        artists_df.groupby('Genre Diversity', observed=True)['Band Name']
+        .nunique()
+        .reset_index()
+        .rename(columns={'Band Name': 'Band Count'})
+    )
+    # Plotly Express expects every category of a categorical column to be present, so pass plain labels
+    genre_diversity_counts['Genre Diversity'] = genre_diversity_counts['Genre Diversity'].astype(str)
+    return genre_diversity_counts
+
+
+def count_time_trends(df):
+    """
+    Number of tracks released per year and broad genre.
+    """
+    genre_time_data = df.groupby(['Year', 'Broad Genre'])['Track Name'].count().reset_index()
+    genre_time_data.columns = ['Year', 'Genre', 'Track Count']
+    return genre_time_data
+
+
+def count_sentiments(df):
+    """
+    Number of tracks per broad genre and valence sentiment.
+    """
+    sentiment_counts = df.groupby(['Broad Genre', 'Sentiment'], observed=True)['Track Name'].count().reset_index()
+    sentiment_counts.columns = ['Genre', 'Sentiment', 'Track Count']
+    sentiment_counts['Sentiment'] = sentiment_counts['Sentiment'].astype(str)
+    return sentiment_counts
+
+
+# Tables served by the export API: the dataset part each is read from and the aggregate it is built with
+# from the filtered rows, or None to stream the rows themselves
+EXPORT_TABLES = {
+    "tracks": ("tracks", None),
+    "artists": ("artists", None),
+    "genre-counts": ("artists", count_genre_tracks),
+    "genre-diversity": ("artists", count_genre_diversity),
+    "time-trends": ("tracks", count_time_trends),
+    "sentiment": ("tracks", count_sentiments),
+}
+
+
+def warm_up():
+    """
+    Readiness phase: load the default dataset and the charting modules before serving traffic; other
+    datasets load on first use. Returns the seconds spent.
+    """
+    start = time.perf_counter()
+    # Import the deferred modules before any data step, which would otherwise absorb their import time;
+    # pandas imports numpy, so numpy goes first to be measured on its own
+    with timed("import numpy"):
+        np.ndarray  # attribute access executes the lazily imported module
+    with timed("import pandas"):
+        pd.DataFrame
+    get_artists_df()
+    df = get_df()
+    get_similarity_index()
+    get_genre_index(part="artists")
+    get_genre_index()
+    with timed("import plotly.express"):
+        px.scatter  # attribute access executes the lazily imported module
+    # plotly loads its validators and templates on the first figure; pay that here rather than in the
+    # first callback, and before --processes workers fork so each of them starts warm
+    with timed("first figure"):
+        px.scatter(df.head(1), x="Followers", y="Popularity", color="Broad Genre").to_json()
+    return time.perf_counter() - start
+
+
+def report_import_times(top=15):
+    """
+    Print an -X importtime style report for importing this module, followed by the data loading steps.
+    The import is measured in a fresh interpreter so modules already loaded here don't hide their cost.
+    """
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    module_name = os.path.splitext(os.path.basename(__file__))[0]
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        cwd=module_dir, capture_output=True, text=True
+    )
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+
+    total_us = sum(self_us for _, self_us, _ in imports)
+    print(f"Importing {module_name}: {total_us / 1e6:.3f}s across {len(imports)} modules")
+    print(f"\nTop {top} imports by cumulative time:")
+    for name, _, cumulative_us in sorted(imports, key=lambda i: i[2], reverse=True)[:top]:
+        print(f"  {cumulative_us / 1e3:10.1f} ms  {name}")
+    print(f"\nTop {top} imports by self time:")
+    for name, self_us, _ in sorted(imports, key=lambda i: i[1], reverse=True)[:top]:
+        print(f"  {self_us / 1e3:10.1f} ms  {name}")
+
+    warm_up()
+    print("\nData and deferred import steps:")
+    for step, seconds in STARTUP_TIMINGS.items():
+        print(f"  {seconds * 1e3:10.1f} ms  {step}")
+
 
 # Define the app
 app = Dash(__name__)
 
+# Lets a browser switch callback profiling on through cookies, since it cannot add profiling headers
+if PROFILING_ENABLED:
+    install_profile_route(app.server)
 
-# Add the new graph to the layout
-app.layout = html.Div([
-    html.H1("Spotify Bands Data Visualization", style={'textAlign': 'center'}),
 
-    # Dropdown for filtering by genre
-    html.Div([
-        html.Label("Select Genre:"),
-        dcc.Dropdown(
-            id='genre-filter',
-            options=[{'label': genre, 'value': genre} for genre in df['Broad Genre'].unique()],
-            value=None,
-            multi=True
-        )
-    ], style={'width': '48%', 'margin': 'auto'}),
-
-    # Dropdown for filtering by year
-    # html.Div([
-    #     html.Label("Select Year:"),
-    #     dcc.Dropdown(
-    #         id='year-filter',
-    #         options=[{'label': int(year), 'value': int(year)} for year in
-    #                  sorted(df['Release Date'].dt.year.dropna().unique())],
-    #         value=None,
-    #         placeholder="Select a year (optional)"
-    #     )
-    # ], style={'width': '48%', 'margin': 'auto'}),
-
-    # Slider for filtering by popularity
-    html.Div([
-        html.Label("Select Popularity Range:"),
-        dcc.RangeSlider(
-            id='popularity-slider',
-            min=int(df['Popularity'].min()),
-            max=int(df['Popularity'].max()),
-            step=1,
-            value=[int(df['Popularity'].min()), int(df['Popularity'].max())],
-            marks={i: str(i) for i in range(int(df['Popularity'].min()), int(df['Popularity'].max()) + 1, 10)}
-        )
-    ], style={'width': '80%', 'margin': '20px auto'}),
-
-    # Graphs
-    html.Div([
-        dcc.Graph(id='popularity-followers-scatter'),
-        dcc.Graph(id='top-bands-bar'),
-    ], style={'display': 'flex', 'justify-content': 'space-between'}),
-
-    html.Div([
-        dcc.Graph(id='genre-diversity-bar'),
-        dcc.Graph(id='genre-bar'),
-    ], style={'display': 'flex', 'justify-content': 'space-between'}),
-
-    html.Div([
-        dcc.Graph(id='sentiment-analysis'),
-        dcc.Graph(id='time-trends-line-chart'),
-    ], style={'display': 'flex', 'flex-wrap': 'wrap', 'justify-content': 'center'}),
-
-    # 3D Scatter Plot with dynamic axis selection
-    # html.Div([
-    #     html.Label("Select X-axis Feature:"),
-    #     dcc.Dropdown(
-    #         id='x-axis-feature',
-    #         options=[
-    #             {'label': 'Energy', 'value': 'Energy'},
-    #             {'label': 'Danceability', 'value': 'Danceability'},
-    #             {'label': 'Valence', 'value': 'Valence'},
-    #             {'label': 'Acousticness', 'value': 'Acousticness'}
-    #             # {'label': 'Loudness', 'value': 'Loudness'}
-    #         ],
-    #         value='Energy'
-    #     )
-    # ], style={'width': '30%', 'display': 'inline-block'}),
-    #
-    # html.Div([
-    #     html.Label("Select Y-axis Feature:"),
-    #     dcc.Dropdown(
-    #         id='y-axis-feature',
-    #         options=[
-    #             {'label': 'Energy', 'value': 'Energy'},
-    #             {'label': 'Danceability', 'value': 'Danceability'},
-    #             {'label': 'Valence', 'value': 'Valence'},
-    #             {'label': 'Acousticness', 'value': 'Acousticness'}
-    #             # {'label': 'Loudness', 'value': 'Loudness'}
-    #         ],
-    #         value='Danceability'
-    #     )
-    # ], style={'width': '30%', 'display': 'inline-block'}),
-
-    # html.Div([
-    #     html.Label("Select Z-axis Feature:"),
-    #     dcc.Dropdown(
-    #         id='z-axis-feature',
-    #         options=[
-    #             {'label': 'Energy', 'value': 'Energy'},
-    #             {'label': 'Danceability', 'value': 'Danceability'},
-    #             {'label': 'Valence', 'value': 'Valence'},
-    #             {'label': 'Acousticness', 'value': 'Acousticness'}
-    #             # {'label': 'Loudness', 'value': 'Loudness'}
-    #         ],
-    #         value='Valence'
-    #     )
-    # ], style={'width': '30%', 'display': 'inline-block'}),
-
-    # html.Div([
-    #     # dcc.Graph(id='time-trends-line-chart'),
-    #     dcc.Graph(id='time-trends-line-chart'),
-    # ], style={'display': 'flex', 'justify-content': 'space-between'}),
-
-    html.Div([
-        dcc.Graph(id='audio-feature-comparison-parallel'),
-    ], style={'margin': '20px auto', 'width': '90%'}),
-
-    html.Div([
-        dcc.Graph(id='audio-feature-comparison-all'),
-    ], style={'margin': '20px auto', 'width': '90%'})
-])
+def build_live_panel(refresh_seconds):
+    """
+    Panel with the running aggregates of an extraction in progress, redrawn every refresh_seconds.
+    """
+    return html.Div([
+        html.H2("Live Extraction", style={'textAlign': 'center'}),
+        html.Div(id='live-status', style={'textAlign': 'center'}),
+        dcc.Interval(id='live-interval', interval=refresh_seconds * 1000, n_intervals=0),
+        # Number of artists ingested when the figures were last drawn in this page
+        dcc.Store(id='live-version'),
+        html.Div([
+            dcc.Graph(id='live-genre-bar'),
+            dcc.Graph(id='live-time-trends'),
+        ], style={'display': 'flex', 'justify-content': 'space-between'}),
+        html.Div([
+            dcc.Graph(id='live-sentiment'),
+            dcc.Graph(id='live-features'),
+        ], style={'display': 'flex', 'justify-content': 'space-between'}),
+    ])
+
+
+def build_layout(genres, popularity_min, popularity_max, datasets=(), dataset=None, raw_genres=(),
+                 live_refresh=None):
+    """
+    Build the page layout from the genre options and popularity bounds of the data, with the live
+    extraction panel when live_refresh is set.
+    """
+    return html.Div([
+        # The ?dataset= URL parameter selects the dataset and follows the dropdown
+        dcc.Location(id='url', refresh=False),
+
+        html.H1("Spotify Bands Data Visualization", style={'textAlign': 'center'}),
+
+        # Dropdown for choosing the dataset (extract or snapshot) to explore
+        html.Div([
+            html.Label("Select Dataset:"),
+            dcc.Dropdown(
+                id='dataset-select',
+                options=[{'label': name, 'value': name} for name in datasets],
+                value=dataset,
+                clearable=False
+            )
+        ], style={'width': '48%', 'margin': 'auto'}),
+
+        # Dropdown for filtering by genre
+        html.Div([
+            html.Label("Select Genre:"),
+            dcc.Dropdown(
+                id='genre-filter',
+                options=[{'label': genre, 'value': genre} for genre in genres],
+                value=None,
+                multi=True
+            )
+        ], style={'width': '48%', 'margin': 'auto'}),
+
+        # Dropdown for filtering by the raw Spotify genres, with the number of bands tagged with each
+        html.Div([
+            html.Label("Select Spotify Genres:"),
+            dcc.Dropdown(
+                id='raw-genre-filter',
+                options=list(raw_genres),
+                value=None,
+                multi=True
+            ),
+            dcc.RadioItems(
+                id='raw-genre-mode',
+                options=[{'label': 'Any of these genres', 'value': 'any'},
+                         {'label': 'All of these genres', 'value': 'all'}],
+                value='any',
+                inline=True
+            )
+        ], style={'width': '48%', 'margin': 'auto'}),
+
+        # Dropdown for filtering by year
+        # html.Div([
+        #     html.Label("Select Year:"),
+        #     dcc.Dropdown(
+        #         id='year-filter',
+        #         options=[{'label': int(year), 'value': int(year)} for year in
+        #                  sorted(df['Release Date'].dt.year.dropna().unique())],
+        #         value=None,
+        #         placeholder="Select a year (optional)"
+        #     )
+        # ], style={'width': '48%', 'margin': 'auto'}),
+
+        # Slider for filtering by popularity
+        html.Div([
+            html.Label("Select Popularity Range:"),
+            dcc.RangeSlider(
+                id='popularity-slider',
+                min=popularity_min,
+                max=popularity_max,
+                step=1,
+                value=[popularity_min, popularity_max],
+                marks={i: str(i) for i in range(popularity_min, popularity_max + 1, 10)}
+            )
+        ], style={'width': '80%', 'margin': '20px auto'}),
+
+        # Running aggregates of an extraction in progress, when following one
+        build_live_panel(live_refresh) if live_refresh else html.Div(),
+
+        # Graphs
+        html.Div([
+            dcc.Graph(id='popularity-followers-scatter'),
+            dcc.Graph(id='top-bands-bar'),
+        ], style={'display': 'flex', 'justify-content': 'space-between'}),
+
+        html.Div([
+            dcc.Graph(id='genre-diversity-bar'),
+            dcc.Graph(id='genre-bar'),
+        ], style={'display': 'flex', 'justify-content': 'space-between'}),
+
+        html.Div([
+            dcc.Graph(id='sentiment-analysis'),
+            dcc.Graph(id='time-trends-line-chart'),
+        ], style={'display': 'flex', 'flex-wrap': 'wrap', 'justify-content': 'center'}),
+
+        # 3D Scatter Plot with dynamic axis selection
+        # html.Div([
+        #     html.Label("Select X-axis Feature:"),
+        #     dcc.Dropdown(
+        #         id='x-axis-feature',
+        #         options=[
+        #             {'label': 'Energy', 'value': 'Energy'},
+        #             {'label': 'Danceability', 'value': 'Danceability'},
+        #             {'label': 'Valence', 'value': 'Valence'},
+        #             {'label': 'Acousticness', 'value': 'Acousticness'}
+        #             # {'label': 'Loudness', 'value': 'Loudness'}
+        #         ],
+        #         value='Energy'
+        #     )
+        # ], style={'width': '30%', 'display': 'inline-block'}),
+        #
+        # html.Div([
+        #     html.Label("Select Y-axis Feature:"),
+        #     dcc.Dropdown(
+        #         id='y-axis-feature',
+        #         options=[
+        #             {'label': 'Energy', 'value': 'Energy'},
+        #             {'label': 'Danceability', 'value': 'Danceability'},
+        #             {'label': 'Valence', 'value': 'Valence'},
+        #             {'label': 'Acousticness', 'value': 'Acousticness'}
+        #             # {'label': 'Loudness', 'value': 'Loudness'}
+        #         ],
+        #         value='Danceability'
+        #     )
+        # ], style={'width': '30%', 'display': 'inline-block'}),
+
+        # html.Div([
+        #     html.Label("Select Z-axis Feature:"),
+        #     dcc.Dropdown(
+        #         id='z-axis-feature',
+        #         options=[
+        #             {'label': 'Energy', 'value': 'Energy'},
+        #             {'label': 'Danceability', 'value': 'Danceability'},
+        #             {'label': 'Valence', 'value': 'Valence'},
+        #             {'label': 'Acousticness', 'value': 'Acousticness'}
+        #             # {'label': 'Loudness', 'value': 'Loudness'}
+        #         ],
+        #         value='Valence'
+        #     )
+        # ], style={'width': '30%', 'display': 'inline-block'}),
+
+        # html.Div([
+        #     # dcc.Graph(id='time-trends-line-chart'),
+        #     dcc.Graph(id='time-trends-line-chart'),
+        # ], style={'display': 'flex', 'justify-content': 'space-between'}),
+
+        html.Div([
+            dcc.Graph(id='audio-feature-comparison-parallel'),
+        ], style={'margin': '20px auto', 'width': '90%'}),
+
+        html.Div([
+            dcc.Graph(id='audio-feature-comparison-all'),
+        ], style={'margin': '20px auto', 'width': '90%'}),
+
+        # Nearest neighbours over all nine audio features
+        html.Div([
+            html.H2("Find Similar Tracks and Bands"),
+            dcc.RadioItems(
+                id='similar-kind',
+                options=[{'label': 'Bands', 'value': 'bands'}, {'label': 'Tracks', 'value': 'tracks'}],
+                value='bands',
+                inline=True
+            ),
+            html.Label("Search for a band or track:"),
+            dcc.Dropdown(id='similar-query', options=[], value=None, placeholder="Start typing a name"),
+            html.Label("Number of results:"),
+            dcc.Slider(id='similar-count', min=1, max=25, step=1, value=10,
+                       marks={i: str(i) for i in (1, 5, 10, 15, 20, 25)}),
+            dcc.Graph(id='similar-results')
+        ], style={'margin': '20px auto', 'width': '80%'})
+    ])
+
+
+def serve_layout():
+    """
+    Layout for a page view; only needs the default dataset's artist summaries, which the first view
+    loads unless warm_up() already did. Other datasets are loaded when selected.
+    """
+    live_refresh = LIVE_REFRESH_SECONDS if LIVE_FEED is not None else None
+    if live_refresh and not os.path.exists(DATASETS.get().cache_file):
+        # Nothing extracted yet: the live panel alone until the extractor first checkpoints its cache
+        return html.Div([
+            html.H1("Spotify Bands Data Visualization", style={'textAlign': 'center'}),
+            html.Div([
+                html.Label("Select Genre:"),
+                dcc.Dropdown(
+                    id='genre-filter',
+                    options=[{'label': row['Genre'], 'value': row['Genre']}
+                             for row in LIVE_STATS.tables()['genre_tracks']],
+                    value=None,
+                    multi=True
+                )
+            ], style={'width': '48%', 'margin': 'auto'}),
+            build_live_panel(live_refresh)
+        ])
+
+    df = get_artists_df()
+    return build_layout(
+        df['Broad Genre'].unique(),
+        int(df['Popularity'].min()),
+        int(df['Popularity'].max()),
+        DATASETS.names(),
+        DATASETS.default,
+        raw_genre_options(get_genre_index(part="artists")),
+        live_refresh
+    )
+
+
+# Callbacks are validated against a data-free skeleton so assigning the layout function doesn't load the data
+app.validation_layout = build_layout([], 0, 100, live_refresh=LIVE_REFRESH_SECONDS)
+app.layout = serve_layout
+
+
+# Dataset selection: the URL sets the dropdown when the page loads, and the dropdown updates the URL
+@app.callback(
+    [Output('dataset-select', 'value'),
+     Output('url', 'search')],
+    [Input('url', 'search'),
+     Input('dataset-select', 'value')]
+)
+def sync_dataset(search, selected):
+    if ctx.triggered_id == 'dataset-select':
+        name = selected
+    else:
+        name = parse_qs((search or "").lstrip("?")).get("dataset", [selected])[0]
+    name = DATASETS.resolve(name)
+    return name, "?" + urlencode({"dataset": name})
 
 
+@app.callback(
+    [Output('genre-filter', 'options'),
+     Output('raw-genre-filter', 'options'),
+     Output('raw-genre-filter', 'value'),
+     Output('popularity-slider', 'min'),
+     Output('popularity-slider', 'max'),
+     Output('popularity-slider', 'marks'),
+     Output('popularity-slider', 'value')],
+    Input('dataset-select', 'value'),
+    State('raw-genre-filter', 'value')
+)
+def update_filters(dataset, raw_genres):
+    """
+    Fit the genre options and popularity range to the selected dataset, dropping selected raw genres
+    it has no bands for.
+    """
+    df = get_artists_df(dataset)
+    index = get_genre_index(dataset, "artists")
+    popularity_min, popularity_max = int(df['Popularity'].min()), int(df['Popularity'].max())
+    valid_raw_genres = [genre for genre in raw_genres or [] if genre in index.counts]
+    return (
+        [{'label': genre, 'value': genre} for genre in df['Broad Genre'].unique()],
+        raw_genre_options(index),
+        # Leave an unchanged selection alone so the charts are not redrawn for nothing
+        valid_raw_genres if valid_raw_genres != (raw_genres or []) else no_update,
+        popularity_min,
+        popularity_max,
+        {i: str(i) for i in range(popularity_min, popularity_max + 1, 10)},
+        [popularity_min, popularity_max]
+    )
+
 
 # Callbacks for visualizations
 # Existing Callbacks
 @app.callback(
     Output('popularity-followers-scatter', 'figure'),
-    Input('genre-filter', 'value')
+    [Input('genre-filter', 'value'),
+     Input('raw-genre-filter', 'value'),
+     Input('raw-genre-mode', 'value'),
+     Input('dataset-select', 'value')]
 )
-def update_scatter(selected_genres):
-    filtered_df = df[df['Broad Genre'].isin(selected_genres)] if selected_genres else df
+@profiled
+def update_scatter(selected_genres, raw_genres, raw_genre_mode, dataset):
+    df = get_artists_df(dataset)
+    filtered_df = filter_rows(df, selected_genres, genre_query=raw_genre_query(raw_genres, raw_genre_mode),
+                              genre_index=get_genre_index(dataset, "artists"))
     fig = px.scatter(
         filtered_df,
         x="Followers",
@@ -234,11 +817,17 @@ def update_scatter(selected_genres):
 
 @app.callback(
     Output('audio-feature-comparison-all', 'figure'),
-    Input('genre-filter', 'value')
+    [Input('genre-filter', 'value'),
+     Input('raw-genre-filter', 'value'),
+     Input('raw-genre-mode', 'value'),
+     Input('dataset-select', 'value')]
 )
-def update_audio_feature_comparison(selected_genres):
+@profiled
+def update_audio_feature_comparison(selected_genres, raw_genres, raw_genre_mode, dataset):
     # Filter data based on selected genres
-    filtered_df = df[df['Broad Genre'].isin(selected_genres)] if selected_genres else df
+    df = get_df(dataset)
+    filtered_df = filter_rows(df, selected_genres, genre_query=raw_genre_query(raw_genres, raw_genre_mode),
+                              genre_index=get_genre_index(dataset, "tracks"))
 
     # Create a scatter matrix with additional hover data
     fig = px.scatter_matrix(
@@ -324,30 +913,23 @@ def update_audio_feature_comparison(selected_genres):
 
 @app.callback(
     Output('genre-diversity-bar', 'figure'),
-    Input('genre-filter', 'value')
+    [Input('genre-filter', 'value'),
+     Input('raw-genre-filter', 'value'),
+     Input('raw-genre-mode', 'value'),
+     Input('dataset-select', 'value')]
 )
-def update_genre_diversity(selected_genres):
+@profiled
+def update_genre_diversity(selected_genres, raw_genres, raw_genre_mode, dataset):
     """
     Analyze genre diversity for bands and visualize the count of single-genre vs. multi-genre bands.
     """
     # Filter data by selected genres
-    filtered_df = df[df['Broad Genre'].isin(selected_genres)] if selected_genres else df
-
-    # Calculate the number of genres for each band
-    filtered_df['Num Genres'] = filtered_df['Genres'].apply(lambda x: len(x.split(", ")))
-
-    # Classify bands as single-genre or multi-genre
-    filtered_df['Genre Diversity'] = filtered_df['Num Genres'].apply(
-        lambda x: 'Single-Genre' if x == 1 else 'Multi-Genre'
-    )
+    df = get_artists_df(dataset)
+    filtered_df = filter_rows(df, selected_genres, genre_query=raw_genre_query(raw_genres, raw_genre_mode),
+                              genre_index=get_genre_index(dataset, "artists"))
 
     # Count the number of bands in each category
-    genre_diversity_counts = (
-        filtered_df.groupby('Genre Diversity')['Band Name']
-        .nunique()
-        .reset_index()
-        .rename(columns={'Band Name': 'Band Count'})
-    )
+    genre_diversity_counts = count_genre_diversity(filtered_df)
 
     # Create a bar chart
     fig = px.bar(
@@ -378,15 +960,17 @@ def update_genre_diversity(selected_genres):
 @app.callback(
     Output('top-bands-bar', 'figure'),
     [Input('genre-filter', 'value'),
-     Input('popularity-slider', 'value')]
+     Input('popularity-slider', 'value'),
+     Input('raw-genre-filter', 'value'),
+     Input('raw-genre-mode', 'value'),
+     Input('dataset-select', 'value')]
 )
-def update_top_bands(selected_genres, popularity_range):
+@profiled
+def update_top_bands(selected_genres, popularity_range, raw_genres, raw_genre_mode, dataset):
     # Filter data based on selected genres and popularity range
-    filtered_df = df[(df['Popularity'] >= popularity_range[0]) & (df['Popularity'] <= popularity_range[1])]
-
-    # Check if genres are selected, and filter further
-    if selected_genres:
-        filtered_df = filtered_df[filtered_df['Broad Genre'].isin(selected_genres)]
+    df = get_artists_df(dataset)
+    filtered_df = filter_rows(df, selected_genres, popularity_range, raw_genre_query(raw_genres, raw_genre_mode),
+                              get_genre_index(dataset, "artists"))
 
     # Ensure the filtered DataFrame is not empty
     if filtered_df.empty:
@@ -428,20 +1012,32 @@ def update_top_bands(selected_genres, popularity_range):
 # Callback for the Parallel Coordinates Plot with Interactive Genres
 @app.callback(
     Output('audio-feature-comparison-parallel', 'figure'),
-    [Input('genre-filter', 'value'), Input('popularity-slider', 'value')]
+    [Input('genre-filter', 'value'), Input('popularity-slider', 'value'),
+     Input('raw-genre-filter', 'value'), Input('raw-genre-mode', 'value'), Input('dataset-select', 'value')]
 )
-def update_audio_features_parallel_coordinates(selected_genres, popularity_range):
+@profiled
+def update_audio_features_parallel_coordinates(selected_genres, popularity_range, raw_genres, raw_genre_mode, dataset):
     """
     Update the parallel coordinates plot based on selected genres.
     """
     # Filter data based on selected genres and popularity range
-    filtered_df = df[(df['Popularity'] >= popularity_range[0]) & (df['Popularity'] <= popularity_range[1])]
-    if selected_genres:
-        filtered_df = filtered_df[filtered_df['Broad Genre'].isin(selected_genres)]
+    df = get_artists_df(dataset)
+    filtered_df = filter_rows(df, selected_genres, popularity_range, raw_genre_query(raw_genres, raw_genre_mode),
+                              get_genre_index(dataset, "artists"))
 
-    # Calculate the mean audio features for each genre
-    avg_features = filtered_df.groupby('Broad Genre')[
-        ["Energy", "Loudness", "Valence", "Danceability", "Acousticness"]].mean().reset_index()
+    # A combination of genres can leave no bands, and a parallel coordinates plot needs at least one line
+    if filtered_df.empty:
+        return go.Figure().update_layout(title="No Data Available", height=600)
+
+    # Calculate the mean audio features for each genre, weighting each band's means by its track count
+    features = ["Energy", "Loudness", "Valence", "Danceability", "Acousticness"]
+    genre_tracks = filtered_df.groupby('Broad Genre')['Tracks'].sum()
+    avg_features = (
+        filtered_df[features].multiply(filtered_df['Tracks'], axis=0)
+        .groupby(filtered_df['Broad Genre']).sum()
+        .div(genre_tracks, axis=0)
+        .reset_index()
+    )
 
     # Add genre colors
     genre_color_map = {
@@ -509,18 +1105,20 @@ def update_audio_features_parallel_coordinates(selected_genres, popularity_range
 
 @app.callback(
     Output('genre-bar', 'figure'),
-    Input('genre-filter', 'value')
+    [Input('genre-filter', 'value'),
+     Input('raw-genre-filter', 'value'),
+     Input('raw-genre-mode', 'value'),
+     Input('dataset-select', 'value')]
 )
-def update_genre_bar(selected_genres):
+@profiled
+def update_genre_bar(selected_genres, raw_genres, raw_genre_mode, dataset):
     # Filter data based on the selected genres
-    filtered_df = df[df['Broad Genre'].isin(selected_genres)] if selected_genres else df
-
-    # Count the number of songs per genre
-    genre_counts = filtered_df.groupby('Broad Genre')['Track Name'].count().reset_index()
-    genre_counts.columns = ['Genre', 'Song Count']  # Rename columns for clarity
+    df = get_artists_df(dataset)
+    filtered_df = filter_rows(df, selected_genres, genre_query=raw_genre_query(raw_genres, raw_genre_mode),
+                              genre_index=get_genre_index(dataset, "artists"))
 
-    # Sort the genres alphabetically for a clean presentation
-    genre_counts = genre_counts.sort_values(by='Genre')
+    # Count the number of songs per genre, sorted alphabetically for a clean presentation
+    genre_counts = count_genre_tracks(filtered_df)
 
     # Define the color map for genres
     genre_color_map = {
@@ -619,13 +1217,21 @@ def update_genre_bar(selected_genres):
 # Callback for Time-Based Trends
 @app.callback(
     Output('time-trends-line-chart', 'figure'),
-    Input('genre-filter', 'value')
+    [Input('genre-filter', 'value'),
+     Input('raw-genre-filter', 'value'),
+     Input('raw-genre-mode', 'value'),
+     Input('dataset-select', 'value')]
 )
-def update_time_trends(selected_genres):
-    filtered_df = df[df['Broad Genre'].isin(selected_genres)] if selected_genres else df
-    filtered_df['Year'] = filtered_df['Release Date'].dt.year
-    genre_time_data = filtered_df.groupby(['Year', 'Broad Genre'])['Track Name'].count().reset_index()
-    genre_time_data.columns = ['Year', 'Genre', 'Track Count']
+@profiled
+def update_time_trends(selected_genres, raw_genres, raw_genre_mode, dataset):
+    df = get_df(dataset)
+    filtered_df = filter_rows(df, selected_genres, genre_query=raw_genre_query(raw_genres, raw_genre_mode),
+                              genre_index=get_genre_index(dataset, "tracks"))
+    genre_time_data = count_time_trends(filtered_df)
+
+    # Nothing to plot when the filters leave no tracks with a release year
+    if genre_time_data.empty:
+        return go.Figure().update_layout(title="No Data Available", height=600)
 
     fig = px.line(
         genre_time_data,
@@ -654,8 +1260,8 @@ def update_time_trends(selected_genres):
 
     # Set static axis ranges
     fig.update_layout(
-        xaxis=dict(range=[filtered_df['Year'].min(), filtered_df['Year'].max()], title="Year"),
-        yaxis=dict(range=[0, genre_time_data['Track Count'].max()], title="Number of Tracks Released"),
+        xaxis=dict(range=[int(genre_time_data['Year'].min()), int(genre_time_data['Year'].max())], title="Year"),
+        yaxis=dict(range=[0, int(genre_time_data['Track Count'].max())], title="Number of Tracks Released"),
         dragmode='zoom',
         height=600
     )
@@ -803,29 +1409,23 @@ def update_time_trends(selected_genres):
 
 @app.callback(
     Output('sentiment-analysis', 'figure'),
-    Input('genre-filter', 'value')
+    [Input('genre-filter', 'value'),
+     Input('raw-genre-filter', 'value'),
+     Input('raw-genre-mode', 'value'),
+     Input('dataset-select', 'value')]
 )
-def sentiment_analysis_of_valence(selected_genres):
+@profiled
+def sentiment_analysis_of_valence(selected_genres, raw_genres, raw_genre_mode, dataset):
     """
     Perform sentiment analysis based on the valence attribute of tracks.
     """
     # Filter data by selected genres
-    filtered_df = df[df['Broad Genre'].isin(selected_genres)] if selected_genres else df
-
-    # Categorize valence into sentiment labels
-    def categorize_valence(val):
-        if val >= 0.7:
-            return "Positive"
-        elif val >= 0.3:
-            return "Neutral"
-        else:
-            return "Negative"
-
-    filtered_df['Sentiment'] = filtered_df['Valence'].apply(categorize_valence)
+    df = get_df(dataset)
+    filtered_df = filter_rows(df, selected_genres, genre_query=raw_genre_query(raw_genres, raw_genre_mode),
+                              genre_index=get_genre_index(dataset, "tracks"))
 
     # Aggregate sentiment counts per genre
-    sentiment_counts = filtered_df.groupby(['Broad Genre', 'Sentiment'])['Track Name'].count().reset_index()
-    sentiment_counts.columns = ['Genre', 'Sentiment', 'Track Count']
+    sentiment_counts = count_sentiments(filtered_df)
 
     # Create a grouped bar chart
     fig = px.bar(
@@ -856,6 +1456,355 @@ def sentiment_analysis_of_valence(selected_genres):
     return fig
 
 
+# Similar tracks and bands
+@app.callback(
+    Output('similar-query', 'value'),
+    [Input('similar-kind', 'value'),
+     Input('dataset-select', 'value')],
+    prevent_initial_call=True
+)
+def reset_similar_query(kind, dataset):
+    return None
+
+
+@app.callback(
+    Output('similar-query', 'options'),
+    [Input('similar-query', 'search_value'),
+     Input('similar-kind', 'value'),
+     Input('dataset-select', 'value')],
+    State('similar-query', 'value')
+)
+@profiled
+def update_similar_options(search_value, kind, dataset, selected):
+    """
+    Offer at most 50 matching names; the full track list is far too long to send to the browser.
+    """
+    index = get_similarity_index(dataset)
+    options = [{'label': label, 'value': value} for value, label in index.search(kind, search_value)]
+    # Keep the current selection among the options so the dropdown can still display it
+    if selected and all(option['value'] != selected for option in options):
+        label = index.track_label(selected) if kind == 'tracks' else selected
+        if label:
+            options.insert(0, {'label': label, 'value': selected})
+    return options
+
+
+@app.callback(
+    Output('similar-results', 'figure'),
+    [Input('similar-kind', 'value'),
+     Input('similar-query', 'value'),
+     Input('similar-count', 'value'),
+     Input('dataset-select', 'value')]
+)
+@profiled
+def update_similar_results(kind, query, count, dataset):
+    """
+    Plot the closest bands or tracks to the selected one by audio-feature distance.
+    """
+    index = get_similarity_index(dataset)
+    if kind == 'tracks':
+        results = index.similar_tracks(query, count) if query else None
+        label = index.track_label(query) if query else None
+    else:
+        results = index.similar_bands(query, count) if query else None
+        label = query
+
+    if not results:
+        return go.Figure().update_layout(
+            title="Select a band or track to find similar ones",
+            xaxis=dict(title="Distance"),
+            height=400
+        )
+
+    results_df = pd.DataFrame(results)
+    if kind == 'tracks':
+        results_df['Name'] = results_df['track_name'] + " - " + results_df['band']
+        hover_data = ['album']
+    else:
+        results_df['Name'] = results_df['band']
+        hover_data = ['tracks']
+
+    fig = px.bar(
+        results_df,
+        x="distance",
+        y="Name",
+        orientation='h',
+        hover_data=hover_data,
+        title=f"Most Similar {kind.title()} to {label}",
+        labels={"distance": "Audio Feature Distance", "Name": ""}
+    )
+    fig.update_layout(
+        height=max(400, 30 * len(results_df)),
+        yaxis=dict(categoryorder='total descending')  # Closest match on top
+    )
+    return fig
+
+
+@app.callback(
+    [Output('live-status', 'children'),
+     Output('live-genre-bar', 'figure'),
+     Output('live-time-trends', 'figure'),
+     Output('live-sentiment', 'figure'),
+     Output('live-features', 'figure'),
+     Output('live-version', 'data')],
+    [Input('live-interval', 'n_intervals'),
+     Input('genre-filter', 'value')],
+    State('live-version', 'data')
+)
+@profiled
+def update_live(n_intervals, selected_genres, version):
+    """
+    Take in the artists published since the last refresh and redraw the live aggregates. Only the new
+    artists are processed; the figures are drawn from the per-genre aggregates, not the tracks.
+    """
+    if LIVE_FEED is None:
+        raise PreventUpdate
+    LIVE_STATS.follow(LIVE_FEED)
+    status = LIVE_STATS.status()
+    # Drawing the figures costs far more than ingesting, so skip ticks that brought nothing new for this page
+    if ctx.triggered_id == 'live-interval' and status['ingested'] == version:
+        raise PreventUpdate
+    tables = LIVE_STATS.tables(selected_genres)
+
+    if status['updated_at'] is None:
+        message = f"Waiting for artists in {LIVE_FEED.path}"
+    else:
+        message = (f"{status['artists']} artists and {status['tracks']} tracks, last update "
+                   f"{time.strftime('%H:%M:%S', time.localtime(status['updated_at']))}, "
+                   f"{status['mean_ingest_ms']:.2f} ms per artist ingested")
+    if not tables['genre_tracks']:
+        empty = go.Figure().update_layout(title="Waiting for the extractor", height=500)
+        return message, empty, empty, empty, empty, status['ingested']
+
+    genre_color_map = {
+        "Pop": "red",
+        "Rock": "blue",
+        "Hip-Hop": "purple",
+        "Jazz": "orange",
+        "Blues": "lightblue",
+        "K-Pop": "pink",
+        "Metal": "gray",
+        "Punk": "green",
+        "Electronic/Dance": "yellow",
+        "Reggae": "brown",
+        "Country": "gold",
+        "Latin": "teal",
+        "African": "darkgreen",
+        "Other": "lightgray"
+    }
+
+    genre_fig = px.bar(
+        pd.DataFrame(tables['genre_tracks']),
+        x="Song Count",
+        y="Genre",
+        orientation="h",
+        title="Songs Fetched by Genre",
+        text="Song Count",
+        hover_data=["Artists"],
+        color="Genre",
+        color_discrete_map=genre_color_map
+    )
+    genre_fig.update_layout(showlegend=False, height=500, yaxis=dict(categoryorder="total ascending"))
+
+    trends_fig = px.line(
+        pd.DataFrame(tables['time_trends'], columns=['Year', 'Genre', 'Track Count']),
+        x="Year",
+        y="Track Count",
+        color="Genre",
+        title="Tracks Released Over Time by Genre",
+        color_discrete_map=genre_color_map
+    )
+    trends_fig.update_layout(height=500)
+
+    sentiment_fig = px.bar(
+        pd.DataFrame(tables['sentiment'], columns=['Genre', 'Sentiment', 'Track Count']),
+        x="Genre",
+        y="Track Count",
+        color="Sentiment",
+        barmode="group",
+        title="Sentiment of Track Valence by Genre",
+        color_discrete_map={"Positive": "green", "Neutral": "orange", "Negative": "red"}
+    )
+    sentiment_fig.update_layout(height=500, xaxis=dict(tickangle=-45))
+
+    # Mean and standard deviation over the tracks of each genre, for the features on a 0 to 1 scale
+    features_df = pd.DataFrame(tables['features'], columns=['Genre', 'Feature', 'Mean', 'Std'])
+    features_df = features_df[features_df['Feature'].isin(["Energy", "Valence", "Danceability", "Acousticness"])]
+    features_fig = px.bar(
+        features_df,
+        x="Feature",
+        y="Mean",
+        error_y="Std",
+        color="Genre",
+        barmode="group",
+        title="Mean Audio Features by Genre",
+        color_discrete_map=genre_color_map
+    )
+    features_fig.update_layout(height=500, yaxis=dict(range=[0, 1]))
+
+    return message, genre_fig, trends_fig, sentiment_fig, features_fig, status['ingested']
+
+
+@app.server.route("/api/similar")
+def similar_api():
+    """
+    JSON nearest-neighbour lookup: /api/similar?band=<name> or ?track=<track id>, with optional &k=<count>
+    and &dataset=<name> (the default dataset otherwise).
+    """
+    dataset = flask.request.args.get("dataset")
+    if dataset is not None and dataset not in DATASETS.names():
+        return flask.jsonify(error="unknown dataset", datasets=DATASETS.names()), 404
+    index = get_similarity_index(dataset)
+    try:
+        k = min(max(int(flask.request.args.get("k", 10)), 1), 100)
+    except ValueError:
+        return flask.jsonify(error="k must be an integer"), 400
+
+    band = flask.request.args.get("band")
+    track = flask.request.args.get("track")
+    start = time.perf_counter()
+    if track:
+        query, results = {"track": track}, index.similar_tracks(track, k)
+    elif band:
+        query, results = {"band": band}, index.similar_bands(band, k)
+    else:
+        return flask.jsonify(error="pass a band or track parameter"), 400
+    elapsed = time.perf_counter() - start
+
+    if results is None:
+        return flask.jsonify(error="not found", query=query), 404
+    return flask.jsonify(query=query, k=k, took_ms=elapsed * 1e3, results=results)
+
+
+@app.server.route("/api/export/<table>")
+def export_api(table):
+    """
+    Stream a table as CSV, JSON lines or Arrow IPC: /api/export/<table>?format=csv|jsonl|arrow. Rows are
+    filtered like the dashboard with &genre=<broad genre> (repeatable), &min_popularity=, &max_popularity=
+    and &raw_genre=<Spotify genre> (repeatable, all must match; separate alternatives with "|" as in
+    raw_genre=indie rock|indie pop); &columns=<a,b,...> picks columns and &dataset=<name> the dataset.
+    Responses carry an ETag, and a request whose If-None-Match still matches gets an empty 304.
+    """
+    if table not in EXPORT_TABLES:
+        return flask.jsonify(error="unknown table", tables=list(EXPORT_TABLES)), 404
+    dataset = flask.request.args.get("dataset")
+    if dataset is not None and dataset not in DATASETS.names():
+        return flask.jsonify(error="unknown dataset", datasets=DATASETS.names()), 404
+    fmt = flask.request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return flask.jsonify(error="unknown format", formats=list(EXPORT_FORMATS)), 400
+    if fmt == "arrow" and not arrow_available():
+        return flask.jsonify(error="the arrow format needs pyarrow installed"), 501
+
+    genres = sorted(set(flask.request.args.getlist("genre")))
+    genre_query = sorted(sorted(set(value.split("|"))) for value in flask.request.args.getlist("raw_genre"))
+    popularity_range = None
+    try:
+        if "min_popularity" in flask.request.args or "max_popularity" in flask.request.args:
+            popularity_range = (int(flask.request.args.get("min_popularity", 0)),
+                                int(flask.request.args.get("max_popularity", 100)))
+    except ValueError:
+        return flask.jsonify(error="min_popularity and max_popularity must be integers"), 400
+    columns = [column for column in flask.request.args.get("columns", "").split(",") if column]
+
+    # The ETag only needs the file's version, so a revalidation is answered without loading the data
+    part, aggregate = EXPORT_TABLES[table]
+    source = DATASETS.get(dataset)
+    etag = export_etag(source.name, source.version(part), table, fmt, genres, popularity_range, genre_query, columns)
+    if etag in flask.request.if_none_match:
+        response = flask.Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    df = source.get(part)
+    index = source.get(f"{part} genre index") if genre_query else None
+    if aggregate is None:
+        mask = filter_mask(df, genres, popularity_range, genre_query, index)
+    else:
+        df, mask = aggregate(filter_rows(df, genres, popularity_range, genre_query, index)), None
+    unknown = [column for column in columns if column not in df.columns]
+    if unknown:
+        return flask.jsonify(error="unknown columns", unknown=unknown, columns=list(df.columns)), 400
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    # Served in chunks as the generator produces them, without a Content-Length
+    response = flask.Response(stream_table(df, fmt, mask, columns), mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Content-Disposition"] = f'attachment; filename="{source.name}-{table}.{extension}"'
+    return response
+
+
+@app.server.route("/api/datasets")
+def datasets_api():
+    """
+    Served datasets with their loaded parts and estimated memory use.
+    """
+    return flask.jsonify(DATASETS.stats())
+
+
 # Run the app
 if __name__ == '__main__':
-    app.run_server(debug=True)
+    parser = argparse.ArgumentParser(description="Spotify bands visualization dashboard")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--no-debug", dest="debug", action="store_false",
+                        help="Run without the Dash debugger and code reloader")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Serve with this many forked worker processes instead of threads")
+    parser.add_argument("--lazy", action="store_true",
+                        help="Skip the readiness phase and load data on the first request")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print import and data loading times, then exit")
+    parser.add_argument("--dataset", action="append", default=[], metavar="NAME=CACHE_FILE",
+                        help="Serve this extract under NAME; repeat for several. The first one is the default")
+    parser.add_argument("--datasets-dir", metavar="DIR",
+                        help=f"Serve every subdirectory of DIR holding a {CACHE_FILE} as a dataset named after it")
+    parser.add_argument("--memory-limit", type=float, default=DEFAULT_MEMORY_LIMIT_MB, metavar="MB",
+                        help="Unload least recently used datasets when loaded ones exceed this estimate")
+    parser.add_argument("--follow", nargs="?", const=PUBLISH_FILE, metavar="FEED",
+                        help=f"Show a live panel of an extraction run with --publish, reading FEED "
+                             f"({PUBLISH_FILE} by default)")
+    parser.add_argument("--follow-interval", type=float, default=LIVE_REFRESH_SECONDS, metavar="SECONDS",
+                        help="Seconds between refreshes of the live panel")
+    args = parser.parse_args()
+
+    sources = OrderedDict()
+    for spec in args.dataset:
+        name, _, cache_file = spec.partition("=")
+        if not name or not cache_file:
+            parser.error(f"--dataset expects NAME=CACHE_FILE, got {spec!r}")
+        sources[name] = cache_file
+    if args.datasets_dir:
+        sources.update(discover_datasets(args.datasets_dir, CACHE_FILE))
+    if (args.dataset or args.datasets_dir) and not sources:
+        parser.error(f"no {CACHE_FILE} found in {args.datasets_dir}")
+    if sources:
+        DATASETS.configure(sources)
+    DATASETS.memory_limit = args.memory_limit * 1024 ** 2
+
+    if args.follow:
+        LIVE_FEED = ArtistFeed(args.follow)
+        LIVE_REFRESH_SECONDS = args.follow_interval
+        # The feed only carries artists fetched from now on, so start from those already in the cache
+        cache_file = DATASETS.get().cache_file
+        if os.path.exists(cache_file):
+            with open(cache_file, "r") as f:
+                for name, record in json.load(f).items():
+                    LIVE_STATS.ingest(name, record)
+
+    if args.profile_startup:
+        report_import_times()
+        sys.exit(0)
+
+    # With the reloader on, the parent process only watches files; the serving child does the warm-up
+    if LIVE_FEED is not None and not os.path.exists(DATASETS.get().cache_file):
+        print(f"No {DATASETS.get().cache_file} yet; serving the live panel until the extractor checkpoints it")
+    elif not args.lazy and (not args.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+        warm_up()
+        print(f"Dashboard ready in {time.perf_counter() - _IMPORT_STARTED:.2f}s ("
+              + ", ".join(f"{step} {seconds:.2f}s" for step, seconds in STARTUP_TIMINGS.items())
+              + ")")
+
+    app.run_server(host=args.host, port=args.port, debug=args.debug,
+                   threaded=args.processes == 1, processes=args.processes)
@@ -0,0 +1,175 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+from spotifySummaries import summaries_file_for
+
+# Name of the dataset served when none is given and no datasets are configured
+DEFAULT_DATASET = "default"
+
+# Memory budget for loaded datasets, in megabytes
+DEFAULT_MEMORY_LIMIT_MB = 1024
+
+
+def estimate_size(value):
+    """
+    Approximate bytes held by a loaded part: deep memory usage for DataFrames, nbytes() for objects
+    that report their own size.
+    """
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage(deep=True).sum())
+    if callable(getattr(value, "nbytes", None)):
+        return value.nbytes()
+    return sys.getsizeof(value)
+
+
+def discover_datasets(directory, cache_name):
+    """
+    Datasets in a directory of extracts: each subdirectory holding a `cache_name` file is one dataset,
+    named after the subdirectory.
+    """
+    datasets = OrderedDict()
+    for entry in sorted(os.listdir(directory)):
+        cache_file = os.path.join(directory, entry, cache_name)
+        if os.path.isfile(cache_file):
+            datasets[entry] = cache_file
+    return datasets
+
+
+class Dataset:
+    """
+    One extract: its cache file, the summaries next to it, and whatever has been derived from them.
+
+    `parts` maps a part name to a (source, load) pair. source(dataset) returns a key identifying the
+    data the part is built from, such as a file's mtime; load(dataset, previous) builds the part,
+    receiving the previously loaded value so it can be updated incrementally. Each part is loaded on
+    first use and rebuilt when its source key changes.
+    """
+
+    def __init__(self, name, cache_file, parts, on_load=None):
+        self.name = name
+        self.cache_file = cache_file
+        self.summaries_file = summaries_file_for(cache_file)
+        self._parts = parts
+        self._on_load = on_load
+        self._loaded = {}
+        # Reentrant because one part's loader may get another part of the same dataset
+        self._lock = threading.RLock()
+
+    def get(self, part):
+        source, load = self._parts[part]
+        key = source(self)
+        entry = self._loaded.get(part)
+        if entry is None or entry[0] != key:
+            with self._lock:
+                entry = self._loaded.get(part)
+                if entry is None or entry[0] != key:
+                    value = load(self, entry[1] if entry else None)
+                    entry = (key, value, estimate_size(value))
+                    self._loaded[part] = entry
+                    loaded = True
+                else:
+                    loaded = False
+            # Outside the lock so evicting other datasets never waits on a load in progress here
+            if loaded and self._on_load:
+                self._on_load(self)
+        return entry[1]
+
+    def version(self, part):
+        """
+        Source key of a part as it is on disk now, without loading it.
+        """
+        source, _ = self._parts[part]
+        return source(self)
+
+    def loaded_parts(self):
+        return sorted(self._loaded)
+
+    def memory(self):
+        return sum(size for _, _, size in list(self._loaded.values()))
+
+    def unload(self):
+        # Rebinding rather than clearing leaves requests that already hold a part unaffected
+        self._loaded = {}
+
+
+class DatasetRegistry:
+    """
+    Named datasets, each loaded lazily on first access and kept in a least-recently-used order. When the
+    estimated memory of all loaded datasets exceeds memory_limit bytes, the least recently used ones are
+    unloaded until it fits again; the dataset that just loaded is always kept.
+    """
+
+    def __init__(self, sources, parts, memory_limit=DEFAULT_MEMORY_LIMIT_MB * 1024 ** 2):
+        self.memory_limit = memory_limit
+        self._parts = parts
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()
+        self.evictions = 0
+        self.configure(sources)
+
+    def configure(self, sources):
+        """
+        Replace the served datasets with `sources`, a mapping of name to cache file; the first is the default.
+        """
+        with self._lock:
+            self._datasets = OrderedDict(
+                (name, Dataset(name, cache_file, self._parts, self._loaded)) for name, cache_file in sources.items()
+            )
+            self._recent.clear()
+
+    @property
+    def default(self):
+        return next(iter(self._datasets))
+
+    def names(self):
+        return list(self._datasets)
+
+    def resolve(self, name):
+        """
+        `name` when it is a served dataset, otherwise the default one.
+        """
+        return name if name in self._datasets else self.default
+
+    def get(self, name=None):
+        dataset = self._datasets[self.resolve(name)]
+        with self._lock:
+            self._recent[dataset.name] = dataset
+            self._recent.move_to_end(dataset.name)
+        return dataset
+
+    def _loaded(self, dataset):
+        with self._lock:
+            self._recent[dataset.name] = dataset
+            self._recent.move_to_end(dataset.name)
+            total = sum(d.memory() for d in self._recent.values())
+            for name in list(self._recent):
+                if total <= self.memory_limit:
+                    break
+                # get() also records datasets that were only looked up, e.g. for a version check; nothing to evict there
+                if name == dataset.name or not self._recent[name].memory():
+                    continue
+                total -= self._recent[name].memory()
+                self._recent.pop(name).unload()
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Memory use and loaded parts per dataset, most recently used last.
+        """
+        with self._lock:
+            recent = list(self._recent)
+        return {
+            "memory_limit_mb": self.memory_limit / 1024 ** 2,
+            "evictions": self.evictions,
+            "datasets": {
+                name: {
+                    "cache_file": dataset.cache_file,
+                    "loaded": dataset.loaded_parts(),
+                    "memory_mb": dataset.memory() / 1024 ** 2,
+                    "recency": recent.index(name) if name in recent else None,
+                }
+                for name, dataset in self._datasets.items()
+            },
+        }
@@ -0,0 +1,94 @@
+import hashlib
+import importlib
+import importlib.util
+import io
+import json
+
+# Rows serialized at a time; a response never holds more than one chunk of output
+CHUNK_ROWS = 1000
+
+# Export formats with their media type and file extension; arrow is the Arrow IPC stream format
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def arrow_available():
+    """
+    Whether pyarrow is installed; it is optional and only needed for the arrow format.
+    """
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def export_etag(*key):
+    """
+    Strong ETag for an export, a digest of everything the response depends on: the data version,
+    table, filters, columns and format.
+    """
+    return hashlib.sha1(json.dumps(key, default=str).encode()).hexdigest()
+
+
+def chunks(df, mask=None, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Consecutive slices of `df` holding at most chunk_rows rows each, keeping the rows where the boolean
+    array `mask` is set and only `columns` when given. The filtered frame is never built as a whole.
+    """
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        if mask is not None:
+            chunk = chunk[mask[start:start + chunk_rows]]
+        if columns:
+            chunk = chunk[columns]
+        if len(chunk):
+            yield chunk
+
+
+def stream_csv(df, mask=None, columns=None):
+    yield (df[columns] if columns else df).head(0).to_csv(index=False)
+    for chunk in chunks(df, mask, columns):
+        yield chunk.to_csv(index=False, header=False)
+
+
+def stream_jsonl(df, mask=None, columns=None):
+    for chunk in chunks(df, mask, columns):
+        lines = chunk.to_json(orient="records", lines=True, date_format="iso")
+        yield lines if lines.endswith("\n") else lines + "\n"
+
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def stream_arrow(df, mask=None, columns=None):
+    pa = importlib.import_module("pyarrow")
+    sample = (df[columns] if columns else df).head(CHUNK_ROWS)
+    schema = pa.Schema.from_pandas(sample, preserve_index=False)
+    # A column with no values in the sample is typed null; the only such columns here hold text
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield _drain(sink)
+        for chunk in chunks(df, mask, columns):
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield _drain(sink)
+    # Closing the writer appends the end-of-stream marker
+    yield _drain(sink)
+
+
+# Serializer for each export format
+STREAMS = {"csv": stream_csv, "jsonl": stream_jsonl, "arrow": stream_arrow}
+
+
+def stream_table(df, fmt, mask=None, columns=None):
+    """
+    Serialize `df` in export format `fmt` as a generator of chunks, for a streamed response.
+    """
+    return STREAMS[fmt](df, mask, columns)
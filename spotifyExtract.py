@@ -1,12 +1,32 @@
+import argparse
+import difflib
+import glob
+import hashlib
 import spotipy
+from spotipy.cache_handler import MemoryCacheHandler
 from spotipy.oauth2 import SpotifyClientCredentials
 import json
 import os
+import re
+import tempfile
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Set up Spotipy credentials
-client_credentials_manager = SpotifyClientCredentials(client_id="afc0ff7212974456aa59e6f70db640d2",
-                                                      client_secret="40a338c6eb524b4196d01ac62f3de6b0")
-sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+from spotifyHttp import HTTP_CACHE_DIR, create_session
+from spotifyLive import PUBLISH_FILE, publish_artist
+from spotifySummaries import build_summaries, load_summaries, save_summaries, summaries_file_for, summarize_artist
+from spotifyTelemetry import ContextThreadPoolExecutor, ProgressLine, RunTelemetry
+
+# Spotipy credentials, only ever taken from the environment; each machine or process can bring its own
+CLIENT_ID = os.environ.get("SPOTIPY_CLIENT_ID")
+CLIENT_SECRET = os.environ.get("SPOTIPY_CLIENT_SECRET")
+
+# Stand-in credentials for an API stand-in, which accepts any
+PLACEHOLDER_CREDENTIALS = ("placeholder-client-id", "placeholder-client-secret")
+
+# Base URL of a Spotify API stand-in such as spotifyMockApi.py; unset means the real API
+API_URL = os.environ.get("SPOTIFY_API_URL")
 
 # List of artists to search
 artist_names = [
@@ -80,13 +100,13 @@ artist_names = [
     "Zac Brown Band", "Lady A", "Florida Georgia Line", "Little Big Town",
     "Old Dominion", "The Band Perry", "Rascal Flatts", "Brooks & Dunn",
     "The Chicks", "Lonestar", "Alabama", "Sugarland", "Diamond Rio",
-    "Maddie & Tae", "Parmalee"
-    
+    "Maddie & Tae", "Parmalee",
+
     # African Bands
     "P-Square", "Tinariwen", "Sauti Sol", "Wanavokali", "H_Art the Band", "Elani",
     "Mighty Popo", "Ladysmith Black Mambazo", "Freshlyground", "Mafikizolo", "Stimela", "Gnawa Diffusion",
-    "El Tanbura", "Wenge Musica", "Staff Benda Bilili", "Magic System"
-    
+    "El Tanbura", "Wenge Musica", "Staff Benda Bilili", "Magic System",
+
     #Classical Bands
     "2Cellos", "The Piano Guys", "Apocalyptica", "Bond", "Emerson, Lake & Palmer",
     "Electric Light Orchestra (ELO)", "Nightwish", "Berlin Philharmonic Orchestra",
@@ -95,92 +115,564 @@ artist_names = [
 
 ]
 
-# # Limit the number of albums and tracks to fetch for each artist
+# # Limit the number of albums and tracks to fetch for each artist (None fetches the full discography)
 MAX_ALBUMS = 5
 MAX_TRACKS_PER_ALBUM = 5
 
+# Page and batch sizes allowed by the Web API
+ALBUMS_PAGE_SIZE = 50
+TRACKS_PAGE_SIZE = 50
+ALBUMS_PER_REQUEST = 20
+AUDIO_FEATURES_PER_REQUEST = 100
+
 # Cache file
 CACHE_FILE = "spotify_cache.json"
 
-# Load cache if available and valid
-if os.path.exists(CACHE_FILE):
-    try:
-        with open(CACHE_FILE, "r") as f:
-            spotify_data = json.load(f)
-    except json.JSONDecodeError:
-        print("Cache file is corrupted. Starting with an empty cache.")
-        spotify_data = {}
-else:
-    spotify_data = {}
-
-# Fetch data for each artist
-for name in artist_names:
-    if name in spotify_data:
-        print(f"Using cached data for artist: {name}")
-        continue
+# Run report with per-endpoint and per-artist timings, written after every extraction
+REPORT_FILE = "extract_report.json"
+
+# Seconds between cache checkpoints while extracting
+CHECKPOINT_INTERVAL = 10
+
+# Persistent mapping of normalized roster names to Spotify artist IDs
+ARTIST_IDS_FILE = "spotify_artist_ids.json"
+
+# The batch artists endpoint accepts at most this many IDs per call
+ARTISTS_PER_REQUEST = 50
+
+# Search matches whose name similarity to the query falls below this are flagged as suspicious
+MIN_NAME_SIMILARITY = 0.8
+
+
+def create_client(client_id=CLIENT_ID, client_secret=CLIENT_SECRET, session=None, api_url=API_URL):
+    """
+    Set up a Spotipy client with client-credentials auth, sharing `session` for connection pooling.
+    With api_url set, both the Web API and the token endpoint are served from that base URL.
+    """
+    session = session or create_session()
+    if api_url:
+        # Keep stand-in tokens in memory so they never land in the real token cache file
+        client_credentials_manager = SpotifyClientCredentials(client_id=client_id, client_secret=client_secret,
+                                                              requests_session=session,
+                                                              cache_handler=MemoryCacheHandler())
+        client_credentials_manager.OAUTH_TOKEN_URL = api_url.rstrip("/") + "/api/token"
+    else:
+        client_credentials_manager = SpotifyClientCredentials(client_id=client_id, client_secret=client_secret,
+                                                              requests_session=session)
+    sp = spotipy.Spotify(client_credentials_manager=client_credentials_manager, requests_session=session)
+    if api_url:
+        sp.prefix = api_url.rstrip("/") + "/v1/"
+    return sp
+
+
+def load_cache(cache_file):
+    """
+    Load a cache file if available and valid, otherwise start with an empty cache.
+    """
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"Cache file {cache_file} is corrupted. Starting with an empty cache.")
+    return {}
+
+
+def save_cache(spotify_data, cache_file):
+    """
+    Write the cache through a temporary file so readers never see a half-written cache. The temporary
+    file gets a unique name, so processes saving the same file never replace each other's half-written one.
+    """
+    with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(os.path.abspath(cache_file)), suffix=".tmp",
+                                     delete=False) as f:
+        json.dump(spotify_data, f, indent=4)
+    os.replace(f.name, cache_file)
 
+
+def shard_of(name, num_shards):
+    """
+    Stable shard number for an artist name; unlike hash(), md5 is identical across processes and hosts.
+    """
+    digest = hashlib.md5(name.strip().casefold().encode("utf-8")).hexdigest()
+    return int(digest, 16) % num_shards
+
+
+def shard_cache_file(index, num_shards, cache_file=CACHE_FILE):
+    """
+    Partial cache written by one shard, e.g. spotify_cache.shard-0-of-4.json.
+    """
+    base, ext = os.path.splitext(cache_file)
+    return f"{base}.shard-{index}-of-{num_shards}{ext}"
+
+
+def normalize_name(name):
+    """
+    Comparison key for a roster name: Unicode-normalized, whitespace-collapsed and case-folded.
+    """
+    return " ".join(unicodedata.normalize("NFKC", name).split()).casefold()
+
+
+def normalize_roster(names):
+    """
+    Drop repeated roster entries, keeping the first spelling of each name.
+    """
+    roster = {}
+    for name in names:
+        key = normalize_name(name)
+        if key in roster:
+            print(f"Skipping duplicate roster entry: {name}")
+            continue
+        roster[key] = name.strip()
+    return list(roster.values())
+
+
+def name_similarity(query, matched):
+    """
+    Similarity in [0, 1] between a searched name and the matched artist's name, ignoring a leading
+    "The", punctuation and parenthesized abbreviations such as "(ELO)".
+    """
+    def simplify(name):
+        name = re.sub(r"\(.*?\)", "", normalize_name(name))
+        name = re.sub(r"[^\w]+", " ", name).strip()
+        return re.sub(r"^the ", "", name)
+
+    return difflib.SequenceMatcher(None, simplify(query), simplify(matched)).ratio()
+
+
+def search_artist(sp, name):
+    """
+    Resolve one roster name through the search endpoint into an ID-mapping entry.
+    """
     results = sp.search(q="artist:" + name, type="artist", limit=1)
+    entry = {"name": name, "id": None, "matched_name": None, "suspicious": False, "resolved_at": time.time()}
     if results["artists"]["items"]:
         artist = results["artists"]["items"][0]
-        artist_id = artist["id"]
-
-        # Store essential artist information
-        spotify_data[name] = {
-            "name": artist["name"],
-            "id": artist_id,
-            "followers": artist["followers"]["total"],
-            "popularity": artist["popularity"],
-            "genres": artist["genres"],
-            "albums": []
+        entry["id"] = artist["id"]
+        entry["matched_name"] = artist["name"]
+        entry["suspicious"] = name_similarity(name, artist["name"]) < MIN_NAME_SIMILARITY
+    return entry
+
+
+def resolve_artist_ids(sp, names, ids_file=ARTIST_IDS_FILE, workers=1, shared_ids_file=None):
+    """
+    Map roster names to their ID-mapping entries, whose "id" is None when the search found nothing.
+    Resolutions persist in ids_file, so each name is searched once ever; delete its entry to search it again.
+    Names already in shared_ids_file are taken from it, but it is never written: shards resolve into
+    their own ids_file, merged into the shared one by merge_artist_ids. Names whose search fails are
+    logged and left out, to be searched again on the next run.
+    """
+    own = load_cache(ids_file)
+    resolved = {**(load_cache(shared_ids_file) if shared_ids_file else {}), **own}
+    unresolved = [name for name in names if normalize_name(name) not in resolved]
+
+    failed = []
+    if unresolved:
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(search_artist, sp, name): name for name in unresolved}
+                for future in as_completed(futures):
+                    try:
+                        entry = future.result()
+                    except Exception as error:
+                        # One search running out of retries must not cost the names resolved around it
+                        failed.append(futures[future])
+                        print(f"Failed to search for artist {futures[future]}: {error!r}")
+                        continue
+                    resolved[normalize_name(entry["name"])] = own[normalize_name(entry["name"])] = entry
+        finally:
+            save_cache(own, ids_file)
+        print(f"Resolved {len(unresolved) - len(failed)} new artist name(s); "
+              f"{len(names) - len(unresolved)} already known")
+    if failed:
+        print(f"Failed to resolve {len(failed)} artist name(s), searched again on the next run: {', '.join(failed)}")
+
+    for name in names:
+        entry = resolved.get(normalize_name(name))
+        if entry is None:
+            continue
+        if entry["id"] is None:
+            print(f"No Spotify artist found for: {name}")
+        elif entry["suspicious"]:
+            print(f"Suspicious match for {name!r}: resolved to {entry['matched_name']!r} ({entry['id']})")
+
+    return {name: resolved[normalize_name(name)] for name in names if normalize_name(name) in resolved}
+
+
+def best_names_by_id(matches):
+    """
+    Pick one roster name per Spotify artist from `matches`, (roster name, artist ID, matched artist name)
+    triples in roster order: the name most similar to the artist's, the earlier entry on ties. Names left
+    out are logged, suspicious ones as such. Returns a mapping of artist ID to the name kept.
+    """
+    names_by_id = {}
+    for name, artist_id, matched_name in matches:
+        kept = names_by_id.setdefault(artist_id, name)
+        if kept == name:
+            continue
+        if name_similarity(name, matched_name) > name_similarity(kept, matched_name):
+            names_by_id[artist_id], name, kept = name, kept, name
+        if name_similarity(name, matched_name) < MIN_NAME_SIMILARITY:
+            print(f"Skipping {name}: suspicious match for {matched_name!r} ({artist_id}), which {kept} matches better")
+        else:
+            print(f"Skipping {name}: same Spotify artist as {kept}")
+    return names_by_id
+
+
+def fetch_artists(sp, artist_ids):
+    """
+    Fetch full artist objects through the batch artists endpoint, keyed by ID.
+    """
+    artists = {}
+    for start in range(0, len(artist_ids), ARTISTS_PER_REQUEST):
+        batch = artist_ids[start:start + ARTISTS_PER_REQUEST]
+        for artist in sp.artists(batch)["artists"]:
+            if artist:
+                artists[artist["id"]] = artist
+    return artists
+
+
+def fetch_pages(first_page, fetch_page, max_items=None, executor=None):
+    """
+    Items of a paging object followed by those of its later pages, up to max_items.
+    Later page offsets follow from the first page's total and limit, so they are requested
+    concurrently on `executor` instead of walking the `next` links one at a time.
+    """
+    items = list(first_page["items"])
+    total = first_page["total"] if max_items is None else min(first_page["total"], max_items)
+    if first_page["next"] and len(items) < total:
+        limit = first_page["limit"]
+        offsets = range(first_page["offset"] + limit, total, limit)
+        for page in (executor.map if executor else map)(fetch_page, offsets):
+            items.extend(page["items"])
+    return items[:max_items]
+
+
+def fetch_artist(sp, artist, max_albums=MAX_ALBUMS, max_tracks=MAX_TRACKS_PER_ALBUM, executor=None):
+    """
+    Build the cache record for an artist object with up to max_albums albums of up to max_tracks tracks each;
+    None for either means all of them. Extra pages are fetched concurrently on `executor` when given.
+    """
+    artist_id = artist["id"]
+
+    # Store essential artist information
+    artist_data = {
+        "name": artist["name"],
+        "id": artist_id,
+        "followers": artist["followers"]["total"],
+        "popularity": artist["popularity"],
+        "genres": artist["genres"],
+        "albums": []
+    }
+
+    # Fetch the artist's albums, a page of up to 50 at a time
+    page_size = min(max_albums or ALBUMS_PAGE_SIZE, ALBUMS_PAGE_SIZE)
+    albums = fetch_pages(
+        sp.artist_albums(artist_id, album_type="album", limit=page_size),
+        lambda offset: sp.artist_albums(artist_id, album_type="album", limit=page_size, offset=offset),
+        max_albums, executor
+    )
+
+    # Fetch full album objects, which embed the first page of their tracks, up to 20 albums per call
+    album_ids = [album["id"] for album in albums]
+    batches = [album_ids[start:start + ALBUMS_PER_REQUEST] for start in range(0, len(album_ids), ALBUMS_PER_REQUEST)]
+    full_albums = [album for batch in (executor.map if executor else map)(sp.albums, batches)
+                   for album in batch["albums"] if album]
+
+    album_tracks = []
+    for album in full_albums:
+        # Only albums longer than one embedded page need their remaining tracks fetched
+        tracks = fetch_pages(
+            album["tracks"],
+            lambda offset, album_id=album["id"]: sp.album_tracks(album_id, limit=TRACKS_PAGE_SIZE, offset=offset),
+            max_tracks, executor
+        )
+        album_tracks.append((album, tracks))
+
+    # Batch fetch audio features for the tracks of all albums, up to 100 per call
+    track_ids = [track["id"] for _, tracks in album_tracks for track in tracks]
+    audio_features = {}
+    for start in range(0, len(track_ids), AUDIO_FEATURES_PER_REQUEST):
+        batch = track_ids[start:start + AUDIO_FEATURES_PER_REQUEST]
+        for track_id, features in zip(batch, sp.audio_features(batch)):
+            audio_features[track_id] = features
+
+    for album, tracks in album_tracks:
+        # Store essential album information
+        album_data = {
+            "album_name": album["name"],
+            "album_id": album["id"],
+            "release_date": album["release_date"],
+            "total_tracks": album["total_tracks"],
+            "tracks": []
         }
 
-        # Fetch a limited number of albums
-        albums = sp.artist_albums(artist_id, album_type="album", limit=MAX_ALBUMS)
-        for album in albums['items']:
-            album_id = album['id']
-            album_name = album['name']
-
-            # Store essential album information
-            album_data = {
-                "album_name": album_name,
-                "release_date": album["release_date"],
-                "total_tracks": album["total_tracks"],
-                "tracks": []
+        for track in tracks:
+            features = audio_features.get(track["id"])
+            if features:  # Check that audio features exist
+                track_data = {
+                    "track_name": track["name"],
+                    "track_id": track["id"],
+                    "popularity": track.get("popularity", None),  # Popularity may not always be available
+                    "audio_features": {
+                        "acousticness": features["acousticness"],
+                        "danceability": features["danceability"],
+                        "energy": features["energy"],
+                        "instrumentalness": features["instrumentalness"],
+                        "liveness": features["liveness"],
+                        "loudness": features["loudness"],
+                        "speechiness": features["speechiness"],
+                        "tempo": features["tempo"],
+                        "valence": features["valence"]
+                    }
+                }
+                album_data["tracks"].append(track_data)
+
+        artist_data["albums"].append(album_data)
+
+    # Used by merge_shards to resolve the same artist fetched by more than one shard
+    artist_data["fetched_at"] = time.time()
+    return artist_data
+
+
+def extract(sp, names, cache_file=CACHE_FILE, done=None, workers=1, ids_file=ARTIST_IDS_FILE,
+            max_albums=MAX_ALBUMS, max_tracks=MAX_TRACKS_PER_ALBUM, telemetry=None, summaries_file=None,
+            publish_file=None, shared_ids_file=None):
+    """
+    Fetch data for each artist into cache_file, skipping artists already in it or in done.
+    Up to `workers` artists are fetched concurrently, and as many extra pages per artist.
+    Phase and per-artist timings are recorded in `telemetry`. With summaries_file set, artist and
+    genre summary tables are written there alongside the cache. With publish_file set, each fetched
+    artist record is also appended to it as soon as it completes, for a dashboard following the run.
+    Names are resolved into ids_file, reusing the resolutions in shared_ids_file (see resolve_artist_ids).
+    """
+    telemetry = telemetry or RunTelemetry()
+    spotify_data = load_cache(cache_file)
+    done = done or {}
+    artist_summaries = dict((summaries_file and load_summaries(summaries_file) or {}).get("artists", {}))
+
+    pending = []
+    for name in normalize_roster(names):
+        if name in spotify_data or name in done:
+            print(f"Using cached data for artist: {name}")
+            continue
+        pending.append(name)
+
+    # Different roster names can resolve to the same artist; fetch each artist once, under the name that
+    # matches it best, so a suspicious match never takes the data of an artist the roster names exactly
+    fetched_ids = {record["id"] for record in list(spotify_data.values()) + list(done.values())}
+    with telemetry.phase("resolve artist IDs"):
+        resolved = resolve_artist_ids(sp, pending, ids_file, workers, shared_ids_file)
+    matches = []
+    for name, entry in resolved.items():
+        if entry["id"] is None:
+            continue
+        if entry["id"] in fetched_ids:
+            print(f"Skipping {name}: same Spotify artist as an earlier roster entry")
+            continue
+        matches.append((name, entry["id"], entry["matched_name"]))
+    names_by_id = best_names_by_id(matches)
+    with telemetry.phase("fetch artists"):
+        artists = fetch_artists(sp, list(names_by_id))
+    for artist_id in names_by_id.keys() - artists.keys():
+        print(f"Spotify returned no artist for {names_by_id[artist_id]} ({artist_id}); "
+              f"remove it from the ID mapping to search again")
+
+    # Pages get their own pool so artist tasks never wait on pages queued behind other artists;
+    # it runs them in the artist's context so their calls are attributed to that artist
+    failed = []
+    try:
+        with telemetry.phase("fetch discographies"), ProgressLine(telemetry, len(artists)) as progress, \
+                ThreadPoolExecutor(max_workers=workers) as executor, \
+                ContextThreadPoolExecutor(max_workers=workers) as page_executor:
+            futures = {
+                executor.submit(telemetry.track_artist, names_by_id[artist_id], fetch_artist,
+                                sp, artist, max_albums, max_tracks, page_executor): names_by_id[artist_id]
+                for artist_id, artist in artists.items()
             }
+            last_saved = time.monotonic()
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    artist_data = future.result()
+                except Exception as error:
+                    # One artist running out of retries must not cost the rest of the run; it is not
+                    # cached, so the next run fetches it again
+                    failed.append(name)
+                    progress.log(f"Failed to fetch artist {name}: {error!r}")
+                    continue
+                spotify_data[name] = artist_data
+                # Summarize while the record is at hand rather than rereading the whole cache afterwards
+                artist_summaries[name] = summarize_artist(artist_data)
+                if publish_file:
+                    publish_artist(publish_file, name, artist_data)
+                progress.log(f"Data fetched for artist: {name}")
 
-            # Fetch a limited number of tracks in the album
-            album_tracks = sp.album_tracks(album_id, limit=MAX_TRACKS_PER_ALBUM)
-            track_ids = [track["id"] for track in album_tracks["items"]]
-
-            # Batch fetch audio features for all tracks in the album
-            audio_features = sp.audio_features(track_ids)
-
-            for track, features in zip(album_tracks["items"], audio_features):
-                if features:  # Check that audio features exist
-                    track_data = {
-                        "track_name": track["name"],
-                        "track_id": track["id"],
-                        "popularity": track.get("popularity", None),  # Popularity may not always be available
-                        "audio_features": {
-                            "acousticness": features["acousticness"],
-                            "danceability": features["danceability"],
-                            "energy": features["energy"],
-                            "instrumentalness": features["instrumentalness"],
-                            "liveness": features["liveness"],
-                            "loudness": features["loudness"],
-                            "speechiness": features["speechiness"],
-                            "tempo": features["tempo"],
-                            "valence": features["valence"]
-                        }
-                    }
-                    album_data["tracks"].append(track_data)
+                # Checkpoint the cache periodically to avoid losing data if interrupted; rewriting it after
+                # every artist costs time quadratic in the cache size once full discographies are fetched
+                if time.monotonic() - last_saved >= CHECKPOINT_INTERVAL:
+                    save_cache(spotify_data, cache_file)
+                    last_saved = time.monotonic()
+    finally:
+        # Also on an interruption, so nothing fetched since the last checkpoint is lost
+        with telemetry.phase("save cache"):
+            save_cache(spotify_data, cache_file)
+        print(f"All data has been saved to {cache_file}")
+        if summaries_file:
+            with telemetry.phase("save summaries"):
+                save_summaries(build_summaries(spotify_data, {"artists": artist_summaries}), summaries_file)
+            print(f"Artist and genre summaries have been saved to {summaries_file}")
+    if failed:
+        print(f"Failed to fetch {len(failed)} artist(s), retried on the next run: {', '.join(failed)}")
+    return spotify_data
+
+
+def merge_shards(shard_files, cache_file=CACHE_FILE, summaries_file=None, roster=None):
+    """
+    Merge shard caches into cache_file and refresh the summary tables (next to it unless summaries_file
+    is given). When an artist appears more than once the most recently fetched record wins; records from
+    before fetch timestamps existed count as oldest. Roster names holding the same Spotify artist are
+    reduced to one as in extract, with ties going to the name earlier in `roster` (artist_names by default).
+    """
+    summaries_file = summaries_file or summaries_file_for(cache_file)
+    merged = load_cache(cache_file)
+    added = replaced = 0
+    for shard_file in shard_files:
+        for name, record in load_cache(shard_file).items():
+            if name not in merged:
+                added += 1
+            elif record.get("fetched_at", 0) > merged[name].get("fetched_at", 0):
+                replaced += 1
+            else:
+                continue
+            merged[name] = record
+
+    # Shards resolve their names independently, so names that share an artist can end up in different shards
+    roster_order = {}
+    for position, name in enumerate(roster or artist_names):
+        roster_order.setdefault(normalize_name(name), position)
+    ordered = sorted(merged, key=lambda name: roster_order.get(normalize_name(name), len(roster_order)))
+    kept = set(best_names_by_id([(name, merged[name]["id"], merged[name]["name"]) for name in ordered]).values())
+    dropped = [name for name in merged if name not in kept]
+    for name in dropped:
+        del merged[name]
+
+    save_cache(merged, cache_file)
+    print(f"Merged {len(shard_files)} shard(s) into {cache_file}: "
+          f"{added} added, {replaced} replaced, {len(dropped)} dropped as duplicates, {len(merged)} artists total")
+    save_summaries(build_summaries(merged, load_summaries(summaries_file)), summaries_file)
+    return merged
+
+
+def merge_artist_ids(ids_file=ARTIST_IDS_FILE):
+    """
+    Merge the ID mappings written by shards (spotify_artist_ids.shard-*-of-*.json next to ids_file) into
+    ids_file. A name resolved more than once keeps its most recent resolution.
+    """
+    base, ext = os.path.splitext(ids_file)
+    shard_files = sorted(glob.glob(f"{base}.shard-*-of-*{ext}"))
+    merged = load_cache(ids_file)
+    for shard_file in shard_files:
+        for key, entry in load_cache(shard_file).items():
+            if key not in merged or entry.get("resolved_at", 0) > merged[key].get("resolved_at", 0):
+                merged[key] = entry
+    if shard_files:
+        save_cache(merged, ids_file)
+        print(f"Merged the ID mappings of {len(shard_files)} shard(s) into {ids_file}")
+    return merged
+
+
+def parse_shard(value):
+    """
+    Parse an "INDEX/COUNT" shard spec such as "0/4".
+    """
+    try:
+        index, num_shards = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected INDEX/COUNT, got {value!r}")
+    if num_shards < 1 or not 0 <= index < num_shards:
+        raise argparse.ArgumentTypeError(f"shard index must be in [0, {num_shards})")
+    return index, num_shards
 
-            spotify_data[name]["albums"].append(album_data)
 
-        print(f"Data fetched for artist: {name}")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract artist, album and track data from the Spotify API")
+    parser.add_argument("--cache-file", default=CACHE_FILE)
+    parser.add_argument("--summaries-file",
+                        help="Per-artist and per-genre summary tables written with the cache (not for shards); "
+                             "defaults to spotify_summaries.json next to the cache file")
+    parser.add_argument("--shard", type=parse_shard, metavar="INDEX/COUNT",
+                        help="Only fetch the artists hashed to this shard, into the shard's own partial cache")
+    parser.add_argument("--merge", nargs="*", metavar="SHARD_FILE",
+                        help="Merge shard caches (all found next to the cache file by default) into the cache file")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Artists fetched concurrently; the HTTP connection pool is sized to match")
+    parser.add_argument("--http-cache", default=HTTP_CACHE_DIR, metavar="DIR",
+                        help="Directory for cached API responses, revalidated with conditional requests")
+    parser.add_argument("--no-http-cache", dest="http_cache", action="store_const", const=None,
+                        help="Always download full responses")
+    parser.add_argument("--max-age", type=float, metavar="SECONDS",
+                        help="Serve cached responses younger than this without revalidating "
+                             "(defaults to the API's Cache-Control max-age)")
+    parser.add_argument("--api-url", default=API_URL,
+                        help="Base URL of a Spotify API stand-in, e.g. http://127.0.0.1:8900 for spotifyMockApi.py")
+    parser.add_argument("--ids-file", default=ARTIST_IDS_FILE,
+                        help="Persistent roster name to Spotify artist ID mapping")
+    parser.add_argument("--max-albums", type=int, default=MAX_ALBUMS, help="Albums fetched per artist")
+    parser.add_argument("--max-tracks", type=int, default=MAX_TRACKS_PER_ALBUM, help="Tracks fetched per album")
+    parser.add_argument("--full-discography", action="store_true",
+                        help="Fetch every album and every track, ignoring --max-albums and --max-tracks")
+    parser.add_argument("--report", default=REPORT_FILE,
+                        help="Where to write the JSON run report with per-endpoint and per-artist timings")
+    parser.add_argument("--call-log", metavar="FILE", help="Also write one JSON line per API call to FILE")
+    parser.add_argument("--publish", nargs="?", const=PUBLISH_FILE, metavar="FILE",
+                        help=f"Append each fetched artist record to FILE ({PUBLISH_FILE} by default) as it "
+                             f"completes, for spotifyDashboard.py --follow")
+    args = parser.parse_args()
+    if args.full_discography:
+        args.max_albums = args.max_tracks = None
 
-        # Update the cache after each artist to avoid losing data if interrupted
-        with open(CACHE_FILE, "w") as f:
-            json.dump(spotify_data, f, indent=4)
+    client_id, client_secret = CLIENT_ID, CLIENT_SECRET
+    if args.merge is None and not (client_id and client_secret):
+        if not args.api_url:
+            parser.error("Spotify credentials missing: set SPOTIPY_CLIENT_ID and SPOTIPY_CLIENT_SECRET, "
+                         "or use --api-url with a stand-in such as spotifyMockApi.py")
+        client_id, client_secret = client_id or PLACEHOLDER_CREDENTIALS[0], client_secret or PLACEHOLDER_CREDENTIALS[1]
 
-print("All data has been saved to spotify_cache.json")
\ No newline at end of file
+    if args.merge is not None:
+        base, ext = os.path.splitext(args.cache_file)
+        merge_shards(args.merge or sorted(glob.glob(f"{base}.shard-*-of-*{ext}")), args.cache_file,
+                     args.summaries_file)
+        merge_artist_ids(args.ids_file)
+    else:
+        session = create_session(args.workers, cache_dir=args.http_cache, max_age=args.max_age)
+        telemetry = RunTelemetry()
+        telemetry.install(session)
+        sp = create_client(client_id, client_secret, session=session, api_url=args.api_url)
+        # The report is written even for a run that aborts, which is when its timings and errors matter most
+        completed = False
+        try:
+            if args.shard:
+                index, num_shards = args.shard
+                shard_names = [name for name in artist_names if shard_of(name, num_shards) == index]
+                print(f"Shard {index}/{num_shards}: {len(shard_names)} of {len(artist_names)} artists")
+                # Each shard writes its own ID mapping; concurrent shards rewriting the shared one would
+                # drop each other's resolutions
+                extract(sp, shard_names, shard_cache_file(index, num_shards, args.cache_file),
+                        done=load_cache(args.cache_file), workers=args.workers,
+                        ids_file=shard_cache_file(index, num_shards, args.ids_file),
+                        max_albums=args.max_albums, max_tracks=args.max_tracks, telemetry=telemetry,
+                        publish_file=args.publish, shared_ids_file=args.ids_file)
+            else:
+                extract(sp, artist_names, args.cache_file, workers=args.workers, ids_file=args.ids_file,
+                        max_albums=args.max_albums, max_tracks=args.max_tracks, telemetry=telemetry,
+                        summaries_file=args.summaries_file or summaries_file_for(args.cache_file),
+                        publish_file=args.publish)
+            completed = True
+        finally:
+            report = telemetry.write_report(args.report, completed=completed, workers=args.workers, shard=args.shard,
+                                            max_albums=args.max_albums, max_tracks=args.max_tracks)
+            if args.call_log:
+                telemetry.write_call_log(args.call_log)
+            print(f"Fetched {report['artists_fetched']} artists with {report['requests']['calls']} requests "
+                  f"in {report['duration_s']:.1f}s ({report['artists_per_minute']:.1f} artists/min, "
+                  f"{report['requests_per_second']:.1f} req/s); run report written to {args.report}")
@@ -0,0 +1,77 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Separator between the raw genres of an artist in the "Genres" column
+GENRE_SEPARATOR = ", "
+
+
+def bitmap_from_mask(mask):
+    """
+    Pack a boolean row mask into an int whose bit i is set when row i is.
+    """
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def mask_from_bitmap(bitmap, size):
+    """
+    Unpack a bitmap made by bitmap_from_mask back into a boolean mask of `size` rows.
+    """
+    packed = np.frombuffer(bitmap.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(packed, count=size, bitorder="little").astype(bool)
+
+
+class GenreIndex:
+    """
+    Inverted index from each raw Spotify genre to the rows of a DataFrame tagged with it, one bitmap per
+    genre. Queries are lists of groups of genres: a row matches a group when it has any of the group's
+    genres, and the query when it matches every group. Resolving one takes a few integer ANDs and ORs
+    instead of a string scan over the "Genres" column.
+    """
+
+    def __init__(self, genres):
+        """
+        Build the index from `genres`, a Series of "Genres" strings, one per row.
+        """
+        self.size = len(genres)
+        self.all_rows = (1 << self.size) - 1
+        # Rows of one artist share a Genres string, so each distinct string is only split once
+        codes, strings = pd.factorize(genres.fillna(""))
+        codes_by_genre = {}
+        for code, string in enumerate(strings):
+            for genre in string.split(GENRE_SEPARATOR) if string else ():
+                codes_by_genre.setdefault(genre, []).append(code)
+
+        self.bitmaps = {}
+        self.counts = {}
+        for genre, genre_codes in sorted(codes_by_genre.items()):
+            tagged = np.zeros(len(strings), dtype=bool)
+            tagged[genre_codes] = True
+            mask = tagged[codes]
+            self.bitmaps[genre] = bitmap_from_mask(mask)
+            self.counts[genre] = int(mask.sum())
+
+    def genres(self):
+        return list(self.bitmaps)
+
+    def bitmap(self, query):
+        """
+        Bitmap of the rows matching `query`; every row when it has no groups. Unknown genres match no row.
+        """
+        bitmap = self.all_rows
+        for group in query:
+            matches = 0
+            for genre in group:
+                matches |= self.bitmaps.get(genre, 0)
+            bitmap &= matches
+        return bitmap
+
+    def mask(self, query):
+        return mask_from_bitmap(self.bitmap(query), self.size)
+
+    def count(self, query):
+        return bin(self.bitmap(query)).count("1")
+
+    def nbytes(self):
+        return sys.getsizeof(self.bitmaps) + sum(sys.getsizeof(bitmap) for bitmap in self.bitmaps.values())
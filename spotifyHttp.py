@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Directory for cached API responses
+HTTP_CACHE_DIR = ".http_cache"
+
+# Response headers kept with a cached body
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control")
+
+# Same retry policy spotipy mounts on the sessions it builds itself
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def cache_key(url):
+    """
+    Key a GET by endpoint and params; query params are sorted so their order doesn't matter.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    normalized = urlunsplit((parts.scheme, parts.netloc, parts.path, query, ""))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    Transport adapter that keeps GET response bodies on disk with their ETag/Last-Modified.
+
+    A cached response younger than its freshness window is served without touching the network;
+    an older one is revalidated with a conditional request and reused when the server answers 304.
+    The freshness window is max_age seconds, or the response's Cache-Control max-age when max_age is None.
+    Responses carry `cache_status`: "hit", "revalidated" or "miss", and `wire_bytes`, the body bytes
+    actually received.
+    """
+
+    def __init__(self, cache_dir=HTTP_CACHE_DIR, max_age=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _count(self, outcome):
+        with self._stats_lock:
+            self.stats[outcome] += 1
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, cache_key(url) + ".json")
+
+    def _load(self, path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, path, entry):
+        # Unique per write: thread idents repeat across shard processes sharing the cache directory
+        with tempfile.NamedTemporaryFile("w", dir=self.cache_dir, suffix=".tmp", delete=False) as f:
+            json.dump(entry, f)
+        os.replace(f.name, path)
+
+    def _freshness(self, entry):
+        if self.max_age is not None:
+            return self.max_age
+        match = re.search(r"max-age=(\d+)", entry["headers"].get("Cache-Control", ""))
+        return int(match.group(1)) if match else 0
+
+    def _from_cache(self, request, entry, cache_status, wire_response=None):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        response.cache_status = cache_status
+        # A revalidated copy keeps the 304's raw response, whose retry history telemetry reads
+        response.raw = wire_response.raw if wire_response is not None else None
+        response.wire_bytes = len(wire_response.content) if wire_response is not None else 0
+        return response
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        path = self._path(request.url)
+        entry = self._load(path)
+        if entry is not None:
+            if time.time() - entry["stored_at"] < self._freshness(entry):
+                self._count("hits")
+                return self._from_cache(request, entry, "hit")
+            if "ETag" in entry["headers"]:
+                request.headers["If-None-Match"] = entry["headers"]["ETag"]
+            if "Last-Modified" in entry["headers"]:
+                request.headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self._count("revalidated")
+            entry["stored_at"] = time.time()
+            self._store(path, entry)
+            # The 304 is never returned to the caller. _from_cache reads its empty body, which hands the connection
+            # back to the pool (closing it unread would drop the connection instead)
+            cached = self._from_cache(request, entry, "revalidated", response)
+            response.close()
+            return cached
+
+        self._count("misses")
+        if response.status_code == 200:
+            headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+            self._store(path, {
+                "url": request.url,
+                "stored_at": time.time(),
+                "headers": headers,
+                "body": response.content.decode("utf-8"),
+            })
+        response.from_cache = False
+        response.cache_status = "miss"
+        response.wire_bytes = len(response.content)
+        return response
+
+
+def create_session(workers=1, cache_dir=HTTP_CACHE_DIR, max_age=None, retries=3, backoff_factor=0.3):
+    """
+    Build a requests session whose connection pool fits `workers` concurrent requests per host.
+    Pass cache_dir=None to disable the on-disk response cache.
+    """
+    retry = urllib3.Retry(
+        total=retries,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(["GET", "POST"]),
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES
+    )
+    # One pool per host (the API and the accounts service), each holding a connection per worker
+    pool_args = dict(pool_connections=2, pool_maxsize=max(workers, 1), max_retries=retry)
+    if cache_dir:
+        adapter = CachingAdapter(cache_dir=cache_dir, max_age=max_age, **pool_args)
+    else:
+        adapter = HTTPAdapter(**pool_args)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,250 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+from spotifySummaries import FEATURES, release_year
+
+# Feed the extractor appends each fetched artist record to and the dashboard follows
+PUBLISH_FILE = "spotify_live.jsonl"
+
+
+def publish_artist(publish_file, name, record):
+    """
+    Append one artist record to the feed as a JSON line. The line normally goes out in a single
+    append-mode write, so shards publishing to the same file don't interleave and a reader sees at most
+    one partial line, at the end. A short write is continued until the whole line is written.
+    """
+    line = json.dumps({"name": name, "record": record}).encode() + b"\n"
+    fd = os.open(publish_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        written = 0
+        while written < len(line):
+            written += os.write(fd, line[written:])
+    finally:
+        os.close(fd)
+
+
+class ArtistFeed:
+    """
+    Reader that follows a feed written by publish_artist, returning only what was appended since the
+    previous read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self._lock = threading.Lock()
+
+    def read(self):
+        """
+        (name, record) pairs of the complete lines appended since the last read.
+        """
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    # A feed shorter than what was already read has been replaced; start over
+                    if os.fstat(f.fileno()).st_size < self.offset:
+                        self.offset = 0
+                    f.seek(self.offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return []
+            # A line still being written has no newline yet; leave it for the next read
+            end = data.rfind(b"\n") + 1
+            self.offset += end
+            entries = []
+            for line in data[:end].splitlines():
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entries.append((entry["name"], entry["record"]))
+            return entries
+
+
+class RunningStats:
+    """
+    Count, mean and sum of squared deviations of a stream of numbers, updated one value at a time with
+    Welford's method. Groups combine, and a group combined earlier can be taken out again.
+    """
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        # Chan et al.'s pairwise update, as in spotifySummaries.combine_stats
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+
+    def remove(self, other):
+        """
+        Undo an earlier merge(other).
+        """
+        if not other.count:
+            return
+        total = self.count - other.count
+        if total <= 0:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        mean = (self.count * self.mean - other.count * other.mean) / total
+        delta = other.mean - mean
+        self.m2 = max(self.m2 - other.m2 - delta ** 2 * total * other.count / self.count, 0.0)
+        self.mean = mean
+        self.count = total
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None
+
+
+class ArtistContribution:
+    """
+    What one artist record adds to the live aggregates, kept so a refetched record can be taken out again.
+    """
+
+    def __init__(self, record, genre, sentiment_thresholds):
+        self.genre = genre
+        self.fetched_at = record.get("fetched_at", 0)
+        self.tracks = 0
+        self.features = {feature: RunningStats() for feature in FEATURES}
+        self.years = Counter()
+        self.sentiments = Counter()
+        for album in record.get("albums", []):
+            year = release_year(album.get("release_date"))
+            for track in album.get("tracks", []):
+                self.tracks += 1
+                if year:
+                    self.years[year] += 1
+                audio_features = track["audio_features"]
+                for feature in FEATURES:
+                    if audio_features.get(feature) is not None:
+                        self.features[feature].add(audio_features[feature])
+                valence = audio_features.get("valence")
+                if valence is not None:
+                    # Same bins as the dashboard's Sentiment column: [0, low), [low, high), [high, 1]
+                    if valence < sentiment_thresholds[0]:
+                        self.sentiments["Negative"] += 1
+                    elif valence < sentiment_thresholds[1]:
+                        self.sentiments["Neutral"] += 1
+                    else:
+                        self.sentiments["Positive"] += 1
+
+
+class LiveStats:
+    """
+    Per broad genre aggregates of the artists ingested so far: artist and track counts, running audio
+    feature statistics, tracks per release year and per sentiment. Ingesting an artist costs time
+    proportional to its own tracks, whatever the number of artists already ingested.
+    """
+
+    def __init__(self, classify_genre, sentiment_thresholds):
+        self.classify_genre = classify_genre
+        self.sentiment_thresholds = sentiment_thresholds
+        self.contributions = {}
+        self.artists = Counter()
+        self.tracks = Counter()
+        self.features = {}
+        self.years = Counter()
+        self.sentiments = Counter()
+        self.ingested = 0
+        self.ingest_seconds = 0.0
+        self.updated_at = None
+        self._lock = threading.Lock()
+
+    def ingest(self, name, record):
+        """
+        Add an artist record, replacing an earlier record of the same artist unless that one is newer.
+        Returns whether the record was used.
+        """
+        with self._lock:
+            return self._ingest(name, record)
+
+    def _ingest(self, name, record):
+        start = time.perf_counter()
+        previous = self.contributions.get(name)
+        if previous is not None and record.get("fetched_at", 0) < previous.fetched_at:
+            return False
+        contribution = ArtistContribution(
+            record, self.classify_genre(", ".join(record.get("genres", []))), self.sentiment_thresholds
+        )
+        if previous is not None:
+            self._apply(previous, -1)
+        self._apply(contribution, 1)
+        self.contributions[name] = contribution
+        self.ingested += 1
+        self.ingest_seconds += time.perf_counter() - start
+        self.updated_at = time.time()
+        return True
+
+    def _apply(self, contribution, sign):
+        genre = contribution.genre
+        self.artists[genre] += sign
+        self.tracks[genre] += sign * contribution.tracks
+        genre_features = self.features.setdefault(genre, {feature: RunningStats() for feature in FEATURES})
+        for feature, stats in contribution.features.items():
+            if sign > 0:
+                genre_features[feature].merge(stats)
+            else:
+                genre_features[feature].remove(stats)
+        for year, count in contribution.years.items():
+            self.years[year, genre] += sign * count
+        for sentiment, count in contribution.sentiments.items():
+            self.sentiments[genre, sentiment] += sign * count
+
+    def follow(self, feed):
+        """
+        Ingest every record appended to `feed` since the last call. Returns how many were read.
+        """
+        with self._lock:
+            entries = feed.read()
+            for name, record in entries:
+                self._ingest(name, record)
+            return len(entries)
+
+    def tables(self, genres=None):
+        """
+        The aggregates as rows for plotting, limited to `genres` when given.
+        """
+        with self._lock:
+            keep = (lambda genre: genre in genres) if genres else (lambda genre: True)
+            return {
+                "artists": sum(count for genre, count in self.artists.items() if keep(genre)),
+                "genre_tracks": [{"Genre": genre, "Song Count": count, "Artists": self.artists[genre]}
+                                 for genre, count in sorted(self.tracks.items()) if keep(genre) and count],
+                "time_trends": [{"Year": year, "Genre": genre, "Track Count": count}
+                                for (year, genre), count in sorted(self.years.items()) if keep(genre) and count],
+                "sentiment": [{"Genre": genre, "Sentiment": sentiment, "Track Count": count}
+                              for (genre, sentiment), count in sorted(self.sentiments.items())
+                              if keep(genre) and count],
+                "features": [{"Genre": genre, "Feature": feature.capitalize(), "Mean": stats.mean, "Std": stats.std}
+                             for genre, genre_features in sorted(self.features.items()) if keep(genre)
+                             for feature, stats in genre_features.items() if stats.count],
+            }
+
+    def status(self):
+        with self._lock:
+            return {
+                "artists": len(self.contributions),
+                "tracks": sum(self.tracks.values()),
+                "ingested": self.ingested,
+                "mean_ingest_ms": 1e3 * self.ingest_seconds / self.ingested if self.ingested else None,
+                "updated_at": self.updated_at,
+            }
@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+from spotifyTelemetry import percentile
+
+# Percentiles reported for every callback
+PERCENTILES = (50, 95, 99)
+
+
+def parse_outputs(output):
+    """
+    Turn a dependency's output string into the `outputs` field of an update request; multi-output
+    callbacks are encoded by Dash as "..id1.prop1...id2.prop2..".
+    """
+    def split(spec):
+        component_id, prop = spec.rsplit(".", 1)
+        return {"id": component_id, "property": prop}
+
+    if output.startswith("..") and output.endswith(".."):
+        return [split(spec) for spec in output[2:-2].split("...")]
+    return split(output)
+
+
+def find_components(layout, components=None):
+    """
+    Map component id -> (type, props) for every component with an id in a serialized layout.
+    """
+    if components is None:
+        components = {}
+    if isinstance(layout, list):
+        for child in layout:
+            find_components(child, components)
+    elif isinstance(layout, dict) and "props" in layout:
+        props = layout["props"]
+        if isinstance(props.get("id"), str):
+            components[props["id"]] = (layout.get("type"), props)
+        find_components(props.get("children"), components)
+    return components
+
+
+class DashLoadTest:
+    """
+    Replays browser-like interaction sequences against /_dash-update-component.
+
+    Each simulated user loads the page (firing every callback with the initial values, as the browser
+    does) and then repeatedly picks an interactive input: multi-select dropdowns get a random subset of
+    their options and range sliders are dragged through several intermediate ranges. Every callback
+    depending on a changed input is requested, and its latency and outcome recorded.
+    """
+
+    def __init__(self, base_url, users=10, duration=30.0, think_time=0.0, seed=0):
+        self.base_url = base_url.rstrip("/")
+        self.users = users
+        self.duration = duration
+        self.think_time = think_time
+        self.seed = seed
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_messages = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def discover(self):
+        """
+        Fetch the layout and callback graph the browser would load.
+        """
+        layout = requests.get(f"{self.base_url}/_dash-layout", timeout=60).json()
+        self.dependencies = [dep for dep in requests.get(f"{self.base_url}/_dash-dependencies", timeout=60).json()
+                             if not dep.get("clientside_function")]
+        self.components = find_components(layout)
+        self.interactive = sorted({i["id"] for dep in self.dependencies for i in dep["inputs"]
+                                   if self.components.get(i["id"], (None,))[0] in ("Dropdown", "RangeSlider", "Slider")})
+
+    def initial_state(self):
+        return {component_id: dict(props) for component_id, (_, props) in self.components.items()}
+
+    def interaction(self, rng, state, component_id):
+        """
+        Sequence of new values a user produces when operating one input component.
+        """
+        component_type, props = self.components[component_id]
+        if component_type == "Dropdown":
+            values = [o["value"] if isinstance(o, dict) else o for o in props.get("options") or []]
+            if not values:
+                return []
+            if props.get("multi"):
+                return [rng.sample(values, rng.randint(0, min(len(values), 4))) or None]
+            return [rng.choice(values)]
+
+        low, high = props.get("min", 0), props.get("max", 100)
+        if component_type == "Slider":
+            return [rng.randint(low, high) for _ in range(rng.randint(2, 5))]
+
+        # Range slider drag: one handle moves through a few intermediate positions
+        start, end = state[component_id].get("value") or [low, high]
+        steps = []
+        for _ in range(rng.randint(2, 6)):
+            if rng.random() < 0.5:
+                start = rng.randint(low, end)
+            else:
+                end = rng.randint(start, high)
+            steps.append([start, end])
+        return steps
+
+    def fire(self, session, dependency, state, changed):
+        payload = {
+            "output": dependency["output"],
+            "outputs": parse_outputs(dependency["output"]),
+            "inputs": [dict(i, value=state.get(i["id"], {}).get(i["property"])) for i in dependency["inputs"]],
+            "state": [dict(s, value=state.get(s["id"], {}).get(s["property"])) for s in dependency["state"]],
+            "changedPropIds": changed,
+        }
+        start = time.perf_counter()
+        error = None
+        try:
+            response = session.post(f"{self.base_url}/_dash-update-component", json=payload, timeout=60)
+            # 204 means the callback raised PreventUpdate, which is a success
+            if response.status_code not in (200, 204):
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as exc:
+            error = type(exc).__name__
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.samples[dependency["output"]].append(elapsed)
+            if error:
+                self.errors[dependency["output"]] += 1
+                self.error_messages[dependency["output"]].add(error)
+
+    def user(self, index, deadline):
+        rng = random.Random(f"{self.seed}/{index}")
+        session = requests.Session()
+        state = self.initial_state()
+
+        # Page load: every callback fires once with the initial layout values
+        for dependency in self.dependencies:
+            if not dependency.get("prevent_initial_call"):
+                self.fire(session, dependency, state, [])
+
+        while time.monotonic() < deadline and self.interactive:
+            component_id = rng.choice(self.interactive)
+            for value in self.interaction(rng, state, component_id):
+                if time.monotonic() >= deadline:
+                    break
+                state[component_id]["value"] = value
+                changed = [f"{component_id}.value"]
+                for dependency in self.dependencies:
+                    if any(i["id"] == component_id and i["property"] == "value" for i in dependency["inputs"]):
+                        self.fire(session, dependency, state, changed)
+                if self.think_time:
+                    time.sleep(rng.uniform(0, 2 * self.think_time))
+
+    def run(self):
+        self.discover()
+        started = time.monotonic()
+        deadline = started + self.duration
+        threads = [threading.Thread(target=self.user, args=(index, deadline), daemon=True)
+                   for index in range(self.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.report(time.monotonic() - started)
+
+    def report(self, elapsed):
+        """
+        Machine-readable summary: overall throughput plus per-callback latency percentiles and error rates.
+        """
+        def summarize(latencies, errors):
+            latencies = sorted(latencies)
+            summary = {
+                "requests": len(latencies),
+                "errors": errors,
+                "error_rate": errors / len(latencies) if latencies else 0.0,
+                "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+                "mean_ms": 1e3 * sum(latencies) / len(latencies) if latencies else None,
+                "max_ms": 1e3 * latencies[-1] if latencies else None,
+            }
+            for p in PERCENTILES:
+                value = percentile(latencies, p)
+                summary[f"p{p}_ms"] = 1e3 * value if value is not None else None
+            return summary
+
+        callbacks = {}
+        for output, latencies in sorted(self.samples.items()):
+            callbacks[output] = summarize(latencies, self.errors[output])
+            if self.error_messages[output]:
+                callbacks[output]["error_kinds"] = sorted(self.error_messages[output])
+
+        return {
+            "url": self.base_url,
+            "users": self.users,
+            "duration_s": elapsed,
+            "think_time_s": self.think_time,
+            "seed": self.seed,
+            "overall": summarize([s for samples in self.samples.values() for s in samples],
+                                 sum(self.errors.values())),
+            "callbacks": callbacks,
+        }
+
+
+def start_dashboard(port, processes=1):
+    """
+    Launch spotifyDashboard.py without the debugger and wait until it serves its layout.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spotifyDashboard.py")
+    server = subprocess.Popen(
+        [sys.executable, script, "--no-debug", "--port", str(port), "--processes", str(processes)],
+        cwd=os.path.dirname(script), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        if server.poll() is not None:
+            raise RuntimeError(f"Dashboard exited with code {server.returncode}")
+        try:
+            if requests.get(f"{url}/_dash-layout", timeout=5).ok:
+                return server, url
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Dashboard did not become ready within 60s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-user load test for the Dash dashboard")
+    parser.add_argument("--url", help="Test an already running dashboard instead of starting one")
+    parser.add_argument("--port", type=int, default=8060, help="Port for the locally started dashboard")
+    parser.add_argument("--server-workers", type=int, default=1,
+                        help="Worker processes for the locally started dashboard")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between interactions in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default="loadtest_report.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server, url = start_dashboard(args.port, args.server_workers)
+    try:
+        report = DashLoadTest(url, args.users, args.duration, args.think_time, args.seed).run()
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    report["server_workers"] = None if args.url else args.server_workers
+
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=4)
+
+    overall = report["overall"]
+    print(f"{overall['requests']} requests in {report['duration_s']:.1f}s "
+          f"({overall['throughput_rps']:.1f} req/s, {overall['error_rate']:.1%} errors)")
+    for output, stats in report["callbacks"].items():
+        print(f"  {output:45} p50 {stats['p50_ms']:8.1f} ms  p95 {stats['p95_ms']:8.1f} ms  "
+              f"p99 {stats['p99_ms']:8.1f} ms  errors {stats['errors']}")
+    print(f"Report written to {args.report}")
@@ -0,0 +1,437 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+import spotifyExtract
+
+# Audio features served for every track, in the order the real API returns them
+AUDIO_FEATURES = ["acousticness", "danceability", "energy", "instrumentalness", "liveness",
+                  "loudness", "speechiness", "tempo", "valence"]
+
+# Genres handed out to synthetic artists
+SYNTHETIC_GENRES = ["rock", "classic rock", "pop", "dance pop", "hip hop", "rap", "jazz", "blues", "k-pop",
+                    "metal", "punk", "electronic", "reggae", "country", "latin", "afro soul", "indie"]
+
+
+def make_id(*parts):
+    """
+    Stable 22-character Spotify-style ID derived from the given parts.
+    """
+    return hashlib.md5("/".join(parts).encode("utf-8")).hexdigest()[:22]
+
+
+class MockCatalog:
+    """
+    Artists, albums and tracks served by the mock API.
+
+    Artists are either replayed from an extractor cache file or generated on first use from a
+    seed derived from the searched name, so the same name always yields the same discography.
+    Synthetic IDs of the `roster` names can be looked up before those names are ever searched,
+    which keeps ID mappings saved by the extractor valid across mock restarts.
+    """
+
+    def __init__(self, replay_file=None, albums_per_artist=(3, 12), tracks_per_album=(6, 16), seed=0,
+                 roster=()):
+        self.albums_per_artist = albums_per_artist
+        self.tracks_per_album = tracks_per_album
+        self.seed = seed
+        self.synthetic = replay_file is None
+        self.artists = {}
+        self.albums = {}
+        self.tracks = {}
+        self.by_name = {}
+        self.roster_ids = {make_id("artist", name.strip().casefold()): name.strip() for name in roster}
+        self._lock = threading.Lock()
+        if replay_file:
+            with open(replay_file, "r") as f:
+                for name, details in json.load(f).items():
+                    self._add_replayed(name, details)
+
+    def _add_replayed(self, name, details):
+        artist_id = details["id"]
+        album_ids = []
+        for album in details.get("albums", []):
+            album_id = make_id(artist_id, album["album_name"])
+            track_ids = []
+            for track in album.get("tracks", []):
+                self.tracks[track["track_id"]] = {
+                    "id": track["track_id"],
+                    "name": track["track_name"],
+                    "popularity": track.get("popularity"),
+                    "audio_features": track["audio_features"],
+                }
+                track_ids.append(track["track_id"])
+            self.albums[album_id] = {
+                "id": album_id,
+                "name": album["album_name"],
+                "release_date": album["release_date"],
+                "total_tracks": album["total_tracks"],
+                "track_ids": track_ids,
+            }
+            album_ids.append(album_id)
+        self.artists[artist_id] = {
+            "id": artist_id,
+            "name": details["name"],
+            "followers": details["followers"],
+            "popularity": details["popularity"],
+            "genres": details["genres"],
+            "album_ids": album_ids,
+        }
+        self.by_name[name.casefold()] = artist_id
+        self.by_name[details["name"].casefold()] = artist_id
+
+    def _generate(self, name):
+        rng = random.Random(f"{self.seed}/{name.casefold()}")
+        artist_id = make_id("artist", name.casefold())
+        album_ids = []
+        for album_index in range(rng.randint(*self.albums_per_artist)):
+            album_id = make_id(artist_id, str(album_index))
+            track_ids = []
+            for track_index in range(rng.randint(*self.tracks_per_album)):
+                track_id = make_id(album_id, str(track_index))
+                features = {feature: round(rng.random(), 3) for feature in AUDIO_FEATURES}
+                features["loudness"] = round(rng.uniform(-30, 0), 3)
+                features["tempo"] = round(rng.uniform(60, 200), 3)
+                self.tracks[track_id] = {
+                    "id": track_id,
+                    "name": f"{name} Track {album_index + 1}.{track_index + 1}",
+                    "popularity": rng.randint(0, 100),
+                    "audio_features": features,
+                }
+                track_ids.append(track_id)
+            year = rng.randint(1960, 2024)
+            self.albums[album_id] = {
+                "id": album_id,
+                "name": f"{name} Album {album_index + 1}",
+                "release_date": rng.choice([str(year), f"{year}-{rng.randint(1, 12):02d}",
+                                            f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"]),
+                "total_tracks": len(track_ids),
+                "track_ids": track_ids,
+            }
+            album_ids.append(album_id)
+        self.artists[artist_id] = {
+            "id": artist_id,
+            "name": name,
+            "followers": rng.randint(1_000, 50_000_000),
+            "popularity": rng.randint(10, 100),
+            "genres": rng.sample(SYNTHETIC_GENRES, rng.randint(0, 4)),
+            "album_ids": album_ids,
+        }
+        self.by_name[name.casefold()] = artist_id
+        return artist_id
+
+    def find_artist(self, name):
+        """
+        Artist ID for a searched name, or None when replaying and the name is unknown.
+        """
+        key = name.strip().casefold()
+        with self._lock:
+            if key in self.by_name:
+                return self.by_name[key]
+            if self.synthetic and key:
+                return self._generate(name.strip())
+        return None
+
+    def has_artist(self, artist_id):
+        """
+        Whether the artist exists, generating a not yet searched synthetic roster artist on demand.
+        """
+        with self._lock:
+            if artist_id not in self.artists and self.synthetic and artist_id in self.roster_ids:
+                self._generate(self.roster_ids[artist_id])
+            return artist_id in self.artists
+
+    def artist_json(self, artist_id):
+        artist = self.artists[artist_id]
+        return {
+            "id": artist_id,
+            "name": artist["name"],
+            "type": "artist",
+            "uri": f"spotify:artist:{artist_id}",
+            "followers": {"href": None, "total": artist["followers"]},
+            "popularity": artist["popularity"],
+            "genres": artist["genres"],
+        }
+
+    def album_json(self, album_id):
+        album = self.albums[album_id]
+        return {
+            "id": album_id,
+            "name": album["name"],
+            "type": "album",
+            "album_type": "album",
+            "uri": f"spotify:album:{album_id}",
+            "release_date": album["release_date"],
+            "release_date_precision": ["year", "month", "day"][album["release_date"].count("-")],
+            "total_tracks": album["total_tracks"],
+        }
+
+    def track_json(self, track_id):
+        track = self.tracks[track_id]
+        return {
+            "id": track_id,
+            "name": track["name"],
+            "type": "track",
+            "uri": f"spotify:track:{track_id}",
+        }
+
+    def features_json(self, track_id):
+        track = self.tracks.get(track_id)
+        if track is None:
+            return None
+        return dict(track["audio_features"], id=track_id, type="audio_features", uri=f"spotify:track:{track_id}")
+
+
+def paging(base_url, path, params, items, limit, offset):
+    """
+    Spotify paging object over `items`, with `next`/`previous` links back to this server.
+    """
+    def link(new_offset):
+        return f"{base_url}{path}?{urlencode(dict(params, offset=new_offset, limit=limit))}"
+
+    page = items[offset:offset + limit]
+    return {
+        "href": link(offset),
+        "items": page,
+        "limit": limit,
+        "offset": offset,
+        "total": len(items),
+        "next": link(offset + limit) if offset + limit < len(items) else None,
+        "previous": link(max(offset - limit, 0)) if offset > 0 else None,
+    }
+
+
+class MockSpotifyHandler(BaseHTTPRequestHandler):
+    """
+    Serves the subset of the Web API used by spotifyExtract.py, with injected latency and faults.
+    """
+    protocol_version = "HTTP/1.1"
+
+    routes = [
+        (re.compile(r"^/v1/search/?$"), "search"),
+        (re.compile(r"^/v1/artists/?$"), "several_artists"),
+        (re.compile(r"^/v1/artists/(?P<artist_id>[^/]+)/albums/?$"), "artist_albums"),
+        (re.compile(r"^/v1/albums/?$"), "several_albums"),
+        (re.compile(r"^/v1/albums/(?P<album_id>[^/]+)/tracks/?$"), "album_tracks"),
+        (re.compile(r"^/v1/audio-features/?$"), "audio_features"),
+        (re.compile(r"^/_stats$"), "stats"),
+    ]
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        # Client-credentials token endpoint; any credentials are accepted
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if urlsplit(self.path).path != "/api/token":
+            return self.send_json(404, {"error": {"status": 404, "message": "Not found"}})
+        self.send_json(200, {"access_token": "mock-access-token", "token_type": "Bearer", "expires_in": 3600})
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        for pattern, handler_name in self.routes:
+            match = pattern.match(url.path)
+            if match:
+                break
+        else:
+            return self.send_json(404, {"error": {"status": 404, "message": "Service not found"}})
+
+        if handler_name != "stats":
+            self.server.stats[handler_name] += 1
+            fault = self.server.inject()
+            if fault:
+                self.server.stats[f"{handler_name}:{fault}"] += 1
+                if fault == 429:
+                    return self.send_json(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                                          headers={"Retry-After": str(self.server.retry_after)})
+                return self.send_json(fault, {"error": {"status": fault, "message": "Injected server error"}})
+
+        try:
+            status, body = getattr(self, handler_name)(url.path, params, **match.groupdict())
+        except KeyError:
+            status, body = 404, {"error": {"status": 404, "message": "Non existing id"}}
+        self.send_json(status, body, etag=True)
+
+    def send_json(self, status, body, headers=None, etag=False):
+        payload = json.dumps(body).encode("utf-8")
+        response_headers = {"Content-Type": "application/json; charset=utf-8"}
+        if etag and status == 200:
+            tag = '"' + hashlib.md5(payload).hexdigest() + '"'
+            response_headers["ETag"] = tag
+            response_headers["Cache-Control"] = "public, max-age=0"
+            if self.headers.get("If-None-Match") == tag:
+                status, payload = 304, b""
+        response_headers.update(headers or {})
+
+        self.send_response(status)
+        for name, value in response_headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    @property
+    def base_url(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def search(self, path, params):
+        catalog = self.server.catalog
+        limit, offset = int(params.get("limit", 10)), int(params.get("offset", 0))
+        query = params.get("q", "")
+        name = query.split(":", 1)[1] if query.startswith("artist:") else query
+        artist_id = catalog.find_artist(name)
+        items = [catalog.artist_json(artist_id)] if artist_id else []
+        return 200, {"artists": paging(self.base_url, path, params, items, limit, offset)}
+
+    def several_artists(self, path, params):
+        catalog = self.server.catalog
+        ids = [artist_id for artist_id in params.get("ids", "").split(",") if artist_id]
+        if len(ids) > 50:
+            return 400, {"error": {"status": 400, "message": "Too many ids requested"}}
+        return 200, {"artists": [catalog.artist_json(artist_id) if catalog.has_artist(artist_id) else None
+                                 for artist_id in ids]}
+
+    def artist_albums(self, path, params, artist_id):
+        catalog = self.server.catalog
+        limit, offset = int(params.get("limit", 20)), int(params.get("offset", 0))
+        if limit > 50:
+            return 400, {"error": {"status": 400, "message": "Invalid limit"}}
+        if not catalog.has_artist(artist_id):
+            raise KeyError(artist_id)
+        items = [catalog.album_json(album_id) for album_id in catalog.artists[artist_id]["album_ids"]]
+        return 200, paging(self.base_url, path, params, items, limit, offset)
+
+    def several_albums(self, path, params):
+        catalog = self.server.catalog
+        ids = [album_id for album_id in params.get("ids", "").split(",") if album_id]
+        if len(ids) > 20:
+            return 400, {"error": {"status": 400, "message": "Too many ids requested"}}
+        albums = []
+        for album_id in ids:
+            if album_id not in catalog.albums:
+                albums.append(None)
+                continue
+            # Full album objects embed the first page of up to 50 tracks
+            tracks_path = f"/v1/albums/{album_id}/tracks"
+            albums.append(dict(catalog.album_json(album_id), tracks=paging(
+                self.base_url, tracks_path, {}, self._album_track_items(album_id), 50, 0)))
+        return 200, {"albums": albums}
+
+    def _album_track_items(self, album_id):
+        catalog = self.server.catalog
+        return [catalog.track_json(track_id) for track_id in catalog.albums[album_id]["track_ids"]]
+
+    def album_tracks(self, path, params, album_id):
+        limit, offset = int(params.get("limit", 20)), int(params.get("offset", 0))
+        if limit > 50:
+            return 400, {"error": {"status": 400, "message": "Invalid limit"}}
+        return 200, paging(self.base_url, path, params, self._album_track_items(album_id), limit, offset)
+
+    def audio_features(self, path, params):
+        ids = [track_id for track_id in params.get("ids", "").split(",") if track_id]
+        if len(ids) > 100:
+            return 400, {"error": {"status": 400, "message": "Too many ids requested"}}
+        return 200, {"audio_features": [self.server.catalog.features_json(track_id) for track_id in ids]}
+
+    def stats(self, path, params):
+        return 200, dict(self.server.stats)
+
+
+class MockSpotifyServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server holding the catalog, fault injection settings and per-endpoint request counts.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, catalog, latency=0.0, jitter=0.0, rate_429=0.0, error_rate=0.0,
+                 retry_after=1, seed=0, quiet=True):
+        super().__init__(address, MockSpotifyHandler)
+        self.catalog = catalog
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.quiet = quiet
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        # Accepted TCP connections; with pooling and keep-alive this stays near the number of workers
+        self.stats["connections"] += 1
+        super().process_request(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def inject(self):
+        """
+        Sleep for the configured latency and return a status code to fail with, or None.
+        """
+        with self._rng_lock:
+            delay = max(self.latency + self._rng.uniform(-self.jitter, self.jitter), 0.0)
+            roll = self._rng.random()
+            server_error = self._rng.choice([500, 502, 503])
+        if delay:
+            time.sleep(delay)
+        if roll < self.rate_429:
+            return 429
+        if roll < self.rate_429 + self.error_rate:
+            return server_error
+        return None
+
+
+def start_mock_server(host="127.0.0.1", port=0, catalog=None, **options):
+    """
+    Start a mock server on a background thread (port 0 picks a free port) and return it;
+    point the extractor at `server.url` and call `server.shutdown()` when done.
+    """
+    server = MockSpotifyServer((host, port), catalog or MockCatalog(), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Spotify Web API endpoints the extractor uses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--replay", metavar="CACHE_FILE",
+                        help="Serve artists from an extractor cache instead of generating synthetic ones")
+    parser.add_argument("--albums", type=int, nargs=2, default=(3, 12), metavar=("MIN", "MAX"),
+                        help="Albums per synthetic artist")
+    parser.add_argument("--tracks", type=int, nargs=2, default=(6, 16), metavar=("MIN", "MAX"),
+                        help="Tracks per synthetic album")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- variation of the delay in seconds")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests rejected with 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failed with a 5xx")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    catalog = MockCatalog(args.replay, tuple(args.albums), tuple(args.tracks), seed=args.seed,
+                          roster=spotifyExtract.artist_names)
+    server = MockSpotifyServer((args.host, args.port), catalog, latency=args.latency, jitter=args.jitter,
+                               rate_429=args.rate_429, error_rate=args.error_rate, retry_after=args.retry_after,
+                               seed=args.seed, quiet=not args.verbose)
+    print(f"Mock Spotify API running on {server.url} (request counts at {server.url}/_stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(dict(server.stats), indent=4))
@@ -0,0 +1,180 @@
+import cProfile
+import functools
+import hmac
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+import flask
+
+# Profiling is compiled in only when this is "1"; otherwise `profiled` returns callbacks untouched
+PROFILING_ENABLED = os.environ.get("SPOTIFY_PROFILING") == "1"
+
+# Shared secret admins send in the X-Profile-Token header; without it no request is profiled
+PROFILE_TOKEN = os.environ.get("SPOTIFY_PROFILE_TOKEN", "")
+
+# Where profiles and allocation reports are written
+PROFILE_DIR = os.environ.get("SPOTIFY_PROFILE_DIR", "profiles")
+
+# "sample" writes folded stacks for flamegraph tools, "cprofile" writes a pstats file
+PROFILE_MODE = os.environ.get("SPOTIFY_PROFILE_MODE", "sample")
+
+# Seconds between stack samples
+SAMPLE_INTERVAL = float(os.environ.get("SPOTIFY_PROFILE_INTERVAL", "0.001"))
+
+# Allocation sites listed in the allocation report
+TOP_ALLOCATIONS = 25
+
+# Cookies holding the callback to profile and the token, set by the /profile route so that the callback
+# requests of a browser, which cannot add headers to them, ask for profiling
+PROFILE_COOKIE = "spotify_profile"
+PROFILE_TOKEN_COOKIE = "spotify_profile_token"
+
+# tracemalloc is process-wide, so only one request is profiled at a time; unprofiled requests still run
+_profile_lock = threading.Lock()
+
+
+def profile_requested(callback_name):
+    """
+    Whether the current request asks for `callback_name` to be profiled. The X-Profile header, the
+    `profile` query parameter or the PROFILE_COOKIE cookie names the callback (or "*" for any), and the
+    X-Profile-Token header or PROFILE_TOKEN_COOKIE cookie must match SPOTIFY_PROFILE_TOKEN.
+    """
+    if not flask.has_request_context() or not PROFILE_TOKEN:
+        return False
+    request = flask.request
+    target = request.headers.get("X-Profile") or request.args.get("profile") or request.cookies.get(PROFILE_COOKIE)
+    if target not in ("*", callback_name):
+        return False
+    token = request.headers.get("X-Profile-Token") or request.cookies.get(PROFILE_TOKEN_COOKIE, "")
+    return hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def install_profile_route(server, path="/profile"):
+    """
+    Add a page-side switch to the Flask `server`: opening path?callback=<name or *>&token=<token> in a
+    browser makes its following callback requests ask for profiling, and path without a callback stops it.
+    """
+    @server.route(path)
+    def toggle_profiling():
+        callback_name = flask.request.args.get("callback")
+        response = flask.redirect("/")
+        if not callback_name:
+            response.delete_cookie(PROFILE_COOKIE)
+            response.delete_cookie(PROFILE_TOKEN_COOKIE)
+            return response
+        token = flask.request.args.get("token", "")
+        if not PROFILE_TOKEN or not hmac.compare_digest(token, PROFILE_TOKEN):
+            flask.abort(403)
+        response.set_cookie(PROFILE_COOKIE, callback_name, httponly=True, samesite="Strict")
+        response.set_cookie(PROFILE_TOKEN_COOKIE, token, httponly=True, samesite="Strict")
+        return response
+
+    return toggle_profiling
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from a background thread and counts
+    identical stacks, in the folded "outer;inner count" format read by flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def write_allocation_report(path, callback_name, before, after, peak, elapsed, args):
+    """
+    Allocation sites that grew most between the two tracemalloc snapshots.
+    """
+    with open(path, "w") as f:
+        f.write(f"Callback: {callback_name}\n")
+        f.write(f"Arguments: {args!r}\n")
+        f.write(f"Wall time: {elapsed * 1e3:.1f} ms\n")
+        f.write(f"Peak traced memory: {peak / 1024 ** 2:.2f} MiB\n")
+        # Only profiled calls are serialized; other requests keep running and allocating meanwhile
+        f.write("Memory figures are process-wide: they include allocations made by other threads, such as\n"
+                "other requests served during the call.\n\n")
+        f.write(f"Top {TOP_ALLOCATIONS} allocation sites by size difference:\n")
+        # Leave out what the profiler itself allocated while sampling
+        own = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+        for stat in after.filter_traces(own).compare_to(before.filter_traces(own), "lineno")[:TOP_ALLOCATIONS]:
+            f.write(f"{stat}\n")
+
+
+def profiled(callback):
+    """
+    Decorator for Dash callbacks that profiles the invocation when the request asks for it.
+    Place it below @app.callback. Unless SPOTIFY_PROFILING=1 it returns the callback itself, so
+    production traffic pays nothing.
+    """
+    if not PROFILING_ENABLED:
+        return callback
+
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        if not profile_requested(callback.__name__):
+            return callback(*args, **kwargs)
+
+        with _profile_lock:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            base = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{callback.__name__}-"
+                                             f"{uuid.uuid4().hex[:8]}")
+            # One frame per allocation is all a per-line report needs and keeps tracing overhead low
+            tracemalloc.start(1)
+            before = tracemalloc.take_snapshot()
+            start = time.perf_counter()
+            # Reports are written even when the callback raises, e.g. PreventUpdate
+            try:
+                if PROFILE_MODE == "cprofile":
+                    profiler = cProfile.Profile()
+                    try:
+                        return profiler.runcall(callback, *args, **kwargs)
+                    finally:
+                        profiler.dump_stats(base + ".prof")
+                sampler = StackSampler(threading.get_ident())
+                try:
+                    with sampler:
+                        return callback(*args, **kwargs)
+                finally:
+                    sampler.write(base + ".folded")
+            finally:
+                elapsed = time.perf_counter() - start
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                write_allocation_report(base + ".alloc.txt", callback.__name__, before, after, peak, elapsed, args)
+
+    return wrapper
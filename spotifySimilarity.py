@@ -0,0 +1,224 @@
+import math
+import sys
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Audio features compared, each scaled from its range in the Web API to [0, 1] so no feature dominates
+FEATURE_RANGES = {
+    "Danceability": (0.0, 1.0),
+    "Energy": (0.0, 1.0),
+    "Valence": (0.0, 1.0),
+    "Acousticness": (0.0, 1.0),
+    "Instrumentalness": (0.0, 1.0),
+    "Liveness": (0.0, 1.0),
+    "Speechiness": (0.0, 1.0),
+    "Loudness": (-60.0, 0.0),
+    "Tempo": (0.0, 250.0),
+}
+FEATURES = list(FEATURE_RANGES)
+
+# Scaled tracks and their metadata for one band, reused across reloads while the band's tracks are unchanged
+BandBlock = namedtuple("BandBlock", "signature track_ids track_names albums features centroid rows")
+
+# Consistent view of the index that queries read while update() builds the next one
+Snapshot = namedtuple(
+    "Snapshot", "bands offsets starts blocks band_of_track tracks track_norms centroids centroid_norms"
+)
+
+
+def scale_features(values):
+    """
+    Map raw feature values (one row per track, columns in FEATURES order) onto [0, 1].
+    """
+    low = np.array([FEATURE_RANGES[f][0] for f in FEATURES], dtype=np.float32)
+    span = np.array([FEATURE_RANGES[f][1] - FEATURE_RANGES[f][0] for f in FEATURES], dtype=np.float32)
+    return np.clip((values.astype(np.float32) - low) / span, 0.0, 1.0)
+
+
+def nearest(matrix, norms, vector, count):
+    """
+    Rows of `matrix` closest to `vector` by Euclidean distance, nearest first, as (row, distance) pairs.
+    Squared row norms are precomputed, so each query costs one matrix-vector product.
+    """
+    distances = norms - 2 * (matrix @ vector) + vector @ vector
+    count = min(count, len(distances))
+    if count <= 0:
+        return []
+    rows = np.argpartition(distances, count - 1)[:count]
+    rows = rows[np.argsort(distances[rows])]
+    return [(int(row), math.sqrt(max(float(distances[row]), 0.0))) for row in rows]
+
+
+class SimilarityIndex:
+    """
+    Brute-force k-nearest-neighbour index over all nine audio features, for tracks and for bands (the
+    mean of their tracks). Tracks are kept in one block per band, so update() only rescales the bands
+    whose tracks changed since the previous load.
+    """
+
+    def __init__(self):
+        self._blocks = {}
+        self._band_of_track = {}
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def update(self, df):
+        """
+        Bring the index in line with `df`, which needs "Band Name", "Track ID", "Track Name",
+        "Album Name" and the FEATURES columns. Returns counts of reused, rebuilt and removed bands.
+        """
+        with self._lock:
+            df = df.dropna(subset=FEATURES)
+            # A band's signature changes whenever any of its tracks or their feature values do
+            row_hashes = pd.util.hash_pandas_object(df[["Track ID"] + FEATURES], index=False).to_numpy()
+            groups = pd.Series(row_hashes, index=df.index).groupby(df["Band Name"].to_numpy(), sort=False)
+            sums = groups.sum()
+            signatures = dict(zip(sums.index, zip(sums.to_numpy().tolist(), groups.size().to_numpy().tolist())))
+
+            blocks = {}
+            band_of_track = dict(self._band_of_track)
+            reused = rebuilt = 0
+            rows_by_band = df.groupby("Band Name", sort=False).indices
+            for band, signature in signatures.items():
+                block = self._blocks.get(band)
+                if block is not None and block.signature == signature:
+                    blocks[band] = block
+                    reused += 1
+                    continue
+                if block is not None:
+                    for track_id in block.track_ids:
+                        band_of_track.pop(track_id, None)
+                band_df = df.iloc[rows_by_band[band]]
+                features = scale_features(band_df[FEATURES].to_numpy())
+                track_ids = band_df["Track ID"].tolist()
+                blocks[band] = BandBlock(
+                    signature, track_ids, band_df["Track Name"].tolist(), band_df["Album Name"].tolist(),
+                    features, features.mean(axis=0), {track_id: row for row, track_id in enumerate(track_ids)}
+                )
+                band_of_track.update(dict.fromkeys(track_ids, band))
+                rebuilt += 1
+
+            removed = self._blocks.keys() - blocks.keys()
+            for band in removed:
+                for track_id in self._blocks[band].track_ids:
+                    if band_of_track.get(track_id) == band:
+                        del band_of_track[track_id]
+
+            bands = list(blocks)
+            offsets = {}
+            position = 0
+            for band in bands:
+                offsets[band] = position
+                position += len(blocks[band].track_ids)
+            tracks = (np.concatenate([blocks[band].features for band in bands]) if bands
+                      else np.empty((0, len(FEATURES)), dtype=np.float32))
+            centroids = (np.stack([blocks[band].centroid for band in bands]) if bands
+                         else np.empty((0, len(FEATURES)), dtype=np.float32))
+
+            self._blocks = blocks
+            self._band_of_track = band_of_track
+            self._snapshot = Snapshot(
+                bands, offsets, np.array([offsets[band] for band in bands], dtype=np.int64),
+                blocks, band_of_track,
+                tracks, np.einsum("ij,ij->i", tracks, tracks),
+                centroids, np.einsum("ij,ij->i", centroids, centroids)
+            )
+            return {"reused": reused, "rebuilt": rebuilt, "removed": len(removed)}
+
+    def nbytes(self):
+        """
+        Approximate memory held by the index. The name strings are shared with the DataFrame the index was
+        built from, so only the arrays and containers are counted.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return 0
+        size = sum(array.nbytes for array in (snapshot.starts, snapshot.tracks, snapshot.track_norms,
+                                              snapshot.centroids, snapshot.centroid_norms))
+        size += sys.getsizeof(snapshot.band_of_track) + sys.getsizeof(snapshot.offsets)
+        for block in snapshot.blocks.values():
+            size += block.features.nbytes + sys.getsizeof(block.rows)
+            size += sys.getsizeof(block.track_ids) + sys.getsizeof(block.track_names) + sys.getsizeof(block.albums)
+        return size
+
+    def _track_at(self, snapshot, row):
+        band = snapshot.bands[int(np.searchsorted(snapshot.starts, row, side="right")) - 1]
+        block = snapshot.blocks[band]
+        local = row - snapshot.offsets[band]
+        return band, block, local
+
+    def similar_tracks(self, track_id, k=10):
+        """
+        The k tracks closest to `track_id`, or None when the track isn't indexed.
+        """
+        snapshot = self._snapshot
+        band = snapshot.band_of_track.get(track_id) if snapshot else None
+        if band is None:
+            return None
+        block = snapshot.blocks[band]
+        vector = block.features[block.rows[track_id]]
+
+        # Ask for a few extra rows so copies of the query track can be dropped
+        results = []
+        for row, distance in nearest(snapshot.tracks, snapshot.track_norms, vector, k + 5):
+            match_band, match_block, local = self._track_at(snapshot, row)
+            if match_block.track_ids[local] == track_id:
+                continue
+            results.append({
+                "track_id": match_block.track_ids[local],
+                "track_name": match_block.track_names[local],
+                "band": match_band,
+                "album": match_block.albums[local],
+                "distance": distance,
+            })
+        return results[:k]
+
+    def similar_bands(self, band, k=10):
+        """
+        The k bands whose mean audio features are closest to `band`'s, or None when the band isn't indexed.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or band not in snapshot.blocks:
+            return None
+        vector = snapshot.blocks[band].centroid
+        return [
+            {"band": snapshot.bands[row], "tracks": len(snapshot.blocks[snapshot.bands[row]].track_ids),
+             "distance": distance}
+            for row, distance in nearest(snapshot.centroids, snapshot.centroid_norms, vector, k + 1)
+            if snapshot.bands[row] != band
+        ][:k]
+
+    def search(self, kind, text, limit=50):
+        """
+        Up to `limit` (value, label) pairs of bands or tracks whose name contains `text`, for dropdowns.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+        text = (text or "").casefold()
+        matches = []
+        for band in snapshot.bands:
+            if kind == "bands":
+                if text in band.casefold():
+                    matches.append((band, band))
+            else:
+                block = snapshot.blocks[band]
+                for track_id, track_name in zip(block.track_ids, block.track_names):
+                    if text in track_name.casefold() or text in band.casefold():
+                        matches.append((track_id, f"{track_name} - {band}"))
+                        if len(matches) >= limit:
+                            break
+            if len(matches) >= limit:
+                break
+        return matches[:limit]
+
+    def track_label(self, track_id):
+        snapshot = self._snapshot
+        band = snapshot.band_of_track.get(track_id) if snapshot else None
+        if band is None:
+            return None
+        block = snapshot.blocks[band]
+        return f"{block.track_names[block.rows[track_id]]} - {band}"
@@ -0,0 +1,183 @@
+import json
+import math
+import os
+import tempfile
+import time
+
+# Summary tables, written in the same directory as the cache they summarize
+SUMMARIES_FILE = "spotify_summaries.json"
+
+# Audio features summarized, as named in the cache
+FEATURES = ["acousticness", "danceability", "energy", "instrumentalness", "liveness",
+            "loudness", "speechiness", "tempo", "valence"]
+
+
+def summaries_file_for(cache_file):
+    """
+    Summaries file kept next to a cache file.
+    """
+    return os.path.join(os.path.dirname(cache_file), SUMMARIES_FILE)
+
+
+def summaries_current(summaries_file, cache_file):
+    """
+    Whether the summaries file exists and is at least as new as the cache. The extractor writes the
+    summaries after the cache, so older summaries predate the cache's last save (a checkpoint of a
+    running extraction, or a cache replaced by hand).
+    """
+    try:
+        summaries_mtime = os.path.getmtime(summaries_file)
+    except OSError:
+        return False
+    return not os.path.exists(cache_file) or summaries_mtime >= os.path.getmtime(cache_file)
+
+
+def release_year(release_date):
+    """
+    Year of a release date given with year, month or day precision, or None when it is unknown.
+    """
+    try:
+        year = int((release_date or "")[:4])
+    except ValueError:
+        return None
+    return year or None
+
+
+def feature_stats(values):
+    """
+    Count, mean, sample standard deviation, min and max of a list of numbers.
+    """
+    count = len(values)
+    if not count:
+        return {"count": 0, "mean": None, "std": None, "min": None, "max": None}
+    mean = sum(values) / count
+    m2 = sum((value - mean) ** 2 for value in values)
+    return {
+        "count": count,
+        "mean": mean,
+        "std": math.sqrt(m2 / (count - 1)) if count > 1 else None,
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def combine_stats(parts):
+    """
+    Combine feature_stats of disjoint groups into the stats of their union, without the raw values.
+    """
+    count, mean, m2 = 0, 0.0, 0.0
+    low = high = None
+    for part in parts:
+        if not part["count"]:
+            continue
+        # Chan et al.'s pairwise update of the mean and sum of squared deviations
+        part_m2 = part["std"] ** 2 * (part["count"] - 1) if part["std"] is not None else 0.0
+        delta = part["mean"] - mean
+        total = count + part["count"]
+        mean += delta * part["count"] / total
+        m2 += part_m2 + delta ** 2 * count * part["count"] / total
+        count = total
+        low = part["min"] if low is None else min(low, part["min"])
+        high = part["max"] if high is None else max(high, part["max"])
+    if not count:
+        return feature_stats([])
+    return {"count": count, "mean": mean, "std": math.sqrt(m2 / (count - 1)) if count > 1 else None,
+            "min": low, "max": high}
+
+
+def summarize_artist(record):
+    """
+    Summary of one cached artist record: audio feature stats over its tracks, track and album counts
+    and the span of its release years.
+    """
+    values = {feature: [] for feature in FEATURES}
+    years = []
+    tracks = 0
+    for album in record.get("albums", []):
+        year = release_year(album.get("release_date"))
+        if year:
+            years.append(year)
+        for track in album.get("tracks", []):
+            tracks += 1
+            for feature in FEATURES:
+                value = track["audio_features"].get(feature)
+                if value is not None:
+                    values[feature].append(value)
+
+    return {
+        "id": record.get("id"),
+        "followers": record.get("followers"),
+        "popularity": record.get("popularity"),
+        "genres": record.get("genres", []),
+        "fetched_at": record.get("fetched_at"),
+        "albums": len(record.get("albums", [])),
+        "tracks": tracks,
+        "first_year": min(years) if years else None,
+        "last_year": max(years) if years else None,
+        "features": {feature: feature_stats(values[feature]) for feature in FEATURES},
+    }
+
+
+def summarize_genres(artist_summaries):
+    """
+    Per raw Spotify genre, the same summary combined over every artist tagged with it.
+    """
+    members = {}
+    for name, summary in artist_summaries.items():
+        for genre in summary["genres"]:
+            members.setdefault(genre, []).append(summary)
+
+    genres = {}
+    for genre, summaries in sorted(members.items()):
+        first_years = [s["first_year"] for s in summaries if s["first_year"]]
+        last_years = [s["last_year"] for s in summaries if s["last_year"]]
+        genres[genre] = {
+            "artists": len(summaries),
+            "albums": sum(s["albums"] for s in summaries),
+            "tracks": sum(s["tracks"] for s in summaries),
+            "first_year": min(first_years) if first_years else None,
+            "last_year": max(last_years) if last_years else None,
+            "features": {feature: combine_stats([s["features"][feature] for s in summaries])
+                         for feature in FEATURES},
+        }
+    return genres
+
+
+def build_summaries(spotify_data, previous=None):
+    """
+    Artist and genre summary tables for a cache. Artist summaries in `previous` are reused for
+    artists whose record hasn't been refetched since.
+    """
+    previous_artists = (previous or {}).get("artists", {})
+    artists = {}
+    for name, record in spotify_data.items():
+        summary = previous_artists.get(name)
+        if summary is None or summary.get("fetched_at") != record.get("fetched_at") or "fetched_at" not in record:
+            summary = summarize_artist(record)
+        artists[name] = summary
+    return {
+        "generated_at": time.time(),
+        "artists": artists,
+        "genres": summarize_genres(artists),
+    }
+
+
+def load_summaries(summaries_file=SUMMARIES_FILE):
+    """
+    Load a summaries file, or None when it is missing or unreadable.
+    """
+    try:
+        with open(summaries_file, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_summaries(summaries, summaries_file=SUMMARIES_FILE):
+    """
+    Write the summaries through a uniquely named temporary file so readers never see a half-written file.
+    """
+    with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(os.path.abspath(summaries_file)), suffix=".tmp",
+                                     delete=False) as f:
+        json.dump(summaries, f)
+    os.replace(f.name, summaries_file)
@@ -0,0 +1,292 @@
+import bisect
+import contextvars
+import json
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+# Upper bounds of the latency histogram buckets in milliseconds; slower calls land in an open last bucket
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Path segments naming a collection; the segment following one is an ID and is reported as "{id}"
+COLLECTIONS = {"artists", "albums", "tracks", "audio-features", "playlists", "users", "shows", "episodes"}
+
+# Artists listed in the report's slowest_artists section
+SLOWEST_ARTISTS = 10
+
+# Seconds between redraws of the live progress line on a terminal
+PROGRESS_INTERVAL = 1.0
+
+# Artist the current call is made for; ContextThreadPoolExecutor carries it into page pool threads
+current_artist = contextvars.ContextVar("current_artist", default=None)
+
+
+def endpoint_of(method, url):
+    """
+    Endpoint template of a request, e.g. "GET /v1/albums/{id}/tracks".
+    """
+    segments = urlsplit(url).path.rstrip("/").split("/")
+    for i in range(1, len(segments)):
+        if segments[i - 1] in COLLECTIONS and segments[i] not in COLLECTIONS:
+            segments[i] = "{id}"
+    return f"{method} {'/'.join(segments)}"
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(int(round(p / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def latency_summary(latencies):
+    """
+    Mean, percentiles and a bucketed histogram of call latencies given in seconds.
+    """
+    latencies = sorted(latencies)
+    labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+    counts = [0] * len(labels)
+    for latency in latencies:
+        counts[bisect.bisect_left(LATENCY_BUCKETS_MS, latency * 1e3)] += 1
+    summary = {
+        "mean_ms": 1e3 * sum(latencies) / len(latencies) if latencies else None,
+        "max_ms": 1e3 * latencies[-1] if latencies else None,
+    }
+    for p in (50, 95, 99):
+        value = percentile(latencies, p)
+        summary[f"p{p}_ms"] = 1e3 * value if value is not None else None
+    summary["histogram"] = dict(zip(labels, counts))
+    return summary
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    Thread pool that runs each task in a copy of the submitting thread's context, so calls made on
+    behalf of an artist are attributed to it whichever thread makes them.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class RunTelemetry:
+    """
+    Collects one record per API call made through an installed session (endpoint, status, latency,
+    payload bytes, retries and cache outcome, plus the artist it was made for) and per-artist and
+    per-phase wall times, and turns them into a run report.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.started_at = time.time()
+        self.calls = []
+        self.artists = {}
+        self.failed = {}
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def install(self, session):
+        """
+        Record every response `session` returns, including ones served from the response cache.
+        """
+        session.hooks["response"].append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        # Retries happen inside urllib3, which keeps their history on the final raw response
+        retries = getattr(response.raw, "retries", None)
+        record = {
+            "at": time.monotonic() - self.started,
+            "endpoint": endpoint_of(response.request.method, response.url),
+            "status": response.status_code,
+            # Session.send measures this around the adapter, so it includes retries and their backoff
+            "latency_s": response.elapsed.total_seconds(),
+            # Body bytes received: none for a cache hit, the empty 304 body for a revalidation
+            "bytes": getattr(response, "wire_bytes", len(response.content)),
+            "retries": len(retries.history) if retries else 0,
+            "cache": getattr(response, "cache_status", None),
+            "artist": current_artist.get(),
+        }
+        with self._lock:
+            self.calls.append(record)
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def track_artist(self, name, fetch, *args, **kwargs):
+        """
+        Run fetch(*args, **kwargs) on behalf of artist `name`, timing it and attributing its calls.
+        An exception is recorded as a failed artist and re-raised.
+        """
+        token = current_artist.set(name)
+        start = time.perf_counter()
+        try:
+            artist_data = fetch(*args, **kwargs)
+        except Exception as error:
+            with self._lock:
+                self.failed[name] = {"wall_s": time.perf_counter() - start, "error": repr(error)}
+            raise
+        finally:
+            current_artist.reset(token)
+            elapsed = time.perf_counter() - start
+        with self._lock:
+            self.artists[name] = {
+                "wall_s": elapsed,
+                "albums": len(artist_data["albums"]),
+                "tracks": sum(len(album["tracks"]) for album in artist_data["albums"]),
+            }
+        return artist_data
+
+    def report(self, **run_info):
+        """
+        Machine-readable run summary. Per-artist api_time_s sums the latencies of the artist's calls,
+        which overlap when pages are fetched concurrently, so it can exceed the artist's wall time.
+        """
+        elapsed = time.monotonic() - self.started
+        with self._lock:
+            calls = list(self.calls)
+            artists = {name: dict(stats) for name, stats in self.artists.items()}
+            failed = dict(self.failed)
+
+        by_endpoint = defaultdict(list)
+        by_artist = defaultdict(list)
+        for call in calls:
+            by_endpoint[call["endpoint"]].append(call)
+            if call["artist"] is not None:
+                by_artist[call["artist"]].append(call)
+
+        def totals(group):
+            return {
+                "calls": len(group),
+                "bytes": sum(call["bytes"] for call in group),
+                "retries": sum(call["retries"] for call in group),
+                "errors": sum(call["status"] >= 400 for call in group),
+                "cache": dict(Counter(call["cache"] for call in group if call["cache"])),
+            }
+
+        endpoints = {}
+        for endpoint, group in sorted(by_endpoint.items()):
+            endpoints[endpoint] = totals(group)
+            endpoints[endpoint]["time_s"] = sum(call["latency_s"] for call in group)
+            endpoints[endpoint]["latency"] = latency_summary([call["latency_s"] for call in group])
+
+        for name, stats in artists.items():
+            group = by_artist.get(name, [])
+            stats.update(totals(group))
+            stats["api_time_s"] = sum(call["latency_s"] for call in group)
+            stats["endpoints"] = {}
+            for call in group:
+                endpoint = stats["endpoints"].setdefault(call["endpoint"], {"calls": 0, "time_s": 0.0})
+                endpoint["calls"] += 1
+                endpoint["time_s"] += call["latency_s"]
+
+        slowest = sorted(artists, key=lambda name: artists[name]["wall_s"], reverse=True)[:SLOWEST_ARTISTS]
+        return dict(run_info, **{
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "duration_s": elapsed,
+            "artists_fetched": len(artists),
+            "artists_per_minute": 60 * len(artists) / elapsed if elapsed else 0.0,
+            "requests_per_second": len(calls) / elapsed if elapsed else 0.0,
+            "requests": totals(calls),
+            "latency": latency_summary([call["latency_s"] for call in calls]),
+            "phases_s": dict(self.phases),
+            "endpoints": endpoints,
+            "slowest_artists": [dict(name=name, **artists[name]) for name in slowest],
+            "artists": artists,
+            "artists_failed": failed,
+        })
+
+    def write_report(self, path, **run_info):
+        report = self.report(**run_info)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=4)
+        return report
+
+    def write_call_log(self, path):
+        """
+        One JSON object per API call, in the order the calls completed.
+        """
+        with self._lock:
+            calls = list(self.calls)
+        with open(path, "w") as f:
+            for call in calls:
+                f.write(json.dumps(call) + "\n")
+
+
+class ProgressLine:
+    """
+    Status line with completed artists, throughput and ETA. On a terminal it is redrawn in place every
+    PROGRESS_INTERVAL seconds below the log messages; otherwise it is appended to each message.
+    """
+
+    def __init__(self, telemetry, total, stream=None):
+        self.telemetry = telemetry
+        self.total = total
+        self.stream = stream or sys.stdout
+        self.completed = 0
+        self.live = self.stream.isatty()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def status(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.completed / elapsed if elapsed else 0.0
+        requests = len(self.telemetry.calls) - self.calls_before
+        eta = format_duration((self.total - self.completed) / rate) if rate else "--"
+        return (f"[{self.completed}/{self.total}] {60 * rate:.1f} artists/min, "
+                f"{requests / elapsed if elapsed else 0.0:.1f} req/s, ETA {eta}")
+
+    def _draw(self):
+        self.stream.write(f"\r\033[K{self.status()}")
+        self.stream.flush()
+
+    def _run(self):
+        while not self._stop.wait(PROGRESS_INTERVAL):
+            with self._lock:
+                self._draw()
+
+    def log(self, message):
+        """
+        Count one more completed artist and print `message` with the updated status.
+        """
+        with self._lock:
+            self.completed += 1
+            if self.live:
+                self.stream.write(f"\r\033[K{message}\n")
+                self._draw()
+            else:
+                self.stream.write(f"{message} {self.status()}\n")
+                self.stream.flush()
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        self.calls_before = len(self.telemetry.calls)
+        if self.live:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.live:
+            self._stop.set()
+            self._thread.join()
+            with self._lock:
+                self._draw()
+                self.stream.write("\n")